@@ -0,0 +1,23 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class OffenderResponse(BaseModel):
+    location: str
+    count: int
+    total_ms: float
+    max_ms: float
+
+
+class StallResponse(BaseModel):
+    started_at: float
+    duration_ms: float
+    location: str
+    stack: List[str]
+
+
+class StallReportResponse(BaseModel):
+    threshold_ms: float
+    offenders: List[OffenderResponse]
+    recent: List[StallResponse]
@@ -0,0 +1,70 @@
+import asyncio
+import threading
+
+from fastapi import APIRouter, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from api.admin.profiling.models import (
+    OffenderResponse,
+    StallReportResponse,
+    StallResponse,
+)
+from services.profiling import folded_profile, sample_stacks
+from services.uni import loop_watchdog
+
+router = APIRouter(
+    prefix="/profiling",
+)
+
+profile_lock = asyncio.Lock()
+
+
+@router.get("/stalls", response_model=StallReportResponse)
+async def get_loop_stalls():
+    report = loop_watchdog.report()
+    return StallReportResponse(
+        threshold_ms=report.threshold * 1000,
+        offenders=[
+            OffenderResponse(
+                location=location,
+                count=offender.count,
+                total_ms=offender.total_duration * 1000,
+                max_ms=offender.max_duration * 1000,
+            )
+            for location, offender in sorted(
+                report.offenders.items(),
+                key=lambda item: item[1].total_duration,
+                reverse=True,
+            )
+        ],
+        recent=[
+            StallResponse(
+                started_at=stall.started_at,
+                duration_ms=stall.duration * 1000,
+                location=stall.location,
+                stack=stall.stack,
+            )
+            for stall in reversed(report.recent)
+        ],
+    )
+
+
+@router.get("/profile", response_class=PlainTextResponse)
+async def get_profile(
+    seconds: float = Query(5, gt=0, le=60),
+    interval_ms: float = Query(10, ge=1, le=1000),
+    all_threads: bool = False,
+):
+    if profile_lock.locked():
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A profile is already running",
+        )
+    async with profile_lock:
+        counts = await asyncio.to_thread(
+            sample_stacks,
+            seconds,
+            interval_ms / 1000,
+            None if all_threads else {threading.get_ident()},
+        )
+    return PlainTextResponse(folded_profile(counts))
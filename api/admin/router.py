@@ -1,8 +1,14 @@
 from fastapi import APIRouter, Depends
 
+from api.admin.profiling.router import router as profiling_router
 from api.admin.status.router import router as status_router
+from api.admin.traces.router import router as traces_router
+from api.admin.usage.router import router as usage_router
 from middlewares.auth import admin_only_middleware
 
 router = APIRouter(prefix="/admin", dependencies=[Depends(admin_only_middleware)])
 
 router.include_router(status_router)
+router.include_router(usage_router)
+router.include_router(traces_router)
+router.include_router(profiling_router)
@@ -3,6 +3,17 @@ from typing import Any, Dict, List, Optional
 from pydantic import BaseModel
 
 
+class PoolStatus(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    average_wait_ms: float
+    max_wait_ms: float
+    timeouts: int
+
+
 class PostgresStatus(BaseModel):
     is_connected: bool
     version: Optional[str] = None
@@ -15,6 +26,7 @@ class PostgresStatus(BaseModel):
     tables_count: Optional[int] = None
     error_message: Optional[str] = None
     detailed_stats: Optional[Dict[str, Any]] = None
+    pools: Dict[str, PoolStatus] = {}
 
 
 class TaskConsumerStatus(BaseModel):
@@ -36,6 +48,43 @@ class KnowledgeStatus(BaseModel):
     task_executor_heartbeats: Optional[Dict[str, List[TaskConsumerStatus]]] = None
 
 
+class ReplicaStatus(BaseModel):
+    name: str
+    healthy: bool
+    lag: Optional[float] = None
+    error: Optional[str] = None
+    checked_at: Optional[float] = None
+
+
+class HealthSample(BaseModel):
+    online: bool
+    latency_ms: float
+    checked_at: float
+    error: Optional[str] = None
+
+
+class ServiceHealth(BaseModel):
+    online: bool = False
+    latency_ms: Optional[float] = None
+    checked_at: Optional[float] = None
+    error: Optional[str] = None
+    availability: Optional[float] = None
+    average_latency_ms: Optional[float] = None
+    history: List[HealthSample] = []
+
+
+class CircuitBreakerStatus(BaseModel):
+    state: str
+    calls: int
+    failure_rate: float
+    slow_call_rate: float
+    rejected: int
+    opened_at: Optional[float] = None
+    retry_after: Optional[float] = None
+
+
 class SystemStatus(BaseModel):
     postgres_online: bool = False
     knowledge_online: bool = False
+    services: Dict[str, ServiceHealth] = {}
+    circuit_breakers: Dict[str, CircuitBreakerStatus] = {}
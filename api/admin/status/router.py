@@ -1,141 +1,195 @@
+import json
+import os
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel, Field
 from sqlalchemy import exc, text
-from sqlalchemy.orm import Session
-
-from api.admin.status.models import KnowledgeStatus, PostgresStatus, SystemStatus
-from db.database import get_db
-from services.uni import RAG_AUTHORIZATION, rag_service
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.admin.status.models import (
+    CircuitBreakerStatus,
+    HealthSample,
+    KnowledgeStatus,
+    PoolStatus,
+    PostgresStatus,
+    ReplicaStatus,
+    ServiceHealth,
+    SystemStatus,
+)
+from db.database import get_read_db, pool_statistics, replica_router
+from services.cache import LRUCache
+from services.circuit_breaker import circuit_breakers
+from services.uni import health_monitor
 
 router = APIRouter(
     prefix="/status",
 )
 
 
+def service_health(name: str, include_history: bool = False) -> ServiceHealth:
+    history = health_monitor.history(name)
+    latest = history.latest
+    if latest is None:
+        return ServiceHealth()
+    average_latency = history.average_latency
+    return ServiceHealth(
+        online=latest.online,
+        latency_ms=latest.latency * 1000,
+        checked_at=latest.checked_at,
+        error=latest.error,
+        availability=history.availability,
+        average_latency_ms=(
+            average_latency * 1000 if average_latency is not None else None
+        ),
+        history=(
+            [
+                HealthSample(
+                    online=result.online,
+                    latency_ms=result.latency * 1000,
+                    checked_at=result.checked_at,
+                    error=result.error,
+                )
+                for result in history.results
+            ]
+            if include_history
+            else []
+        ),
+    )
+
+
 @router.get("/", response_model=SystemStatus)
-async def get_status(db: Session = Depends(get_db)):
-    result = SystemStatus()
+async def get_status():
+    return SystemStatus(
+        postgres_online=health_monitor.online("postgres"),
+        knowledge_online=health_monitor.online("ragflow"),
+        services={name: service_health(name) for name in health_monitor.names()},
+        circuit_breakers={
+            name: CircuitBreakerStatus(**breaker.snapshot())
+            for name, breaker in circuit_breakers.items()
+        },
+    )
 
-    try:
-        db.execute(text("SELECT 1")).scalar()
-        result.postgres_online = True
-    except Exception:
-        result.postgres_online = False
 
-    system_status = rag_service.get_system_status(authorization=RAG_AUTHORIZATION)
-    result.knowledge_online = system_status is not None
+@router.get("/circuit-breakers", response_model=Dict[str, CircuitBreakerStatus])
+async def get_circuit_breaker_status():
+    return {name: breaker.snapshot() for name, breaker in circuit_breakers.items()}
 
-    return result
+
+@router.get("/health", response_model=Dict[str, ServiceHealth])
+async def get_health_history():
+    return {
+        name: service_health(name, include_history=True)
+        for name in health_monitor.names()
+    }
 
 
 @router.get("/knowledge", response_model=Optional[KnowledgeStatus])
 async def get_knowledge_status():
-    try:
-        system_status = rag_service.get_system_status(authorization=RAG_AUTHORIZATION)
-        return system_status
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error retrieving knowledge system status: {str(e)}",
-        )
+    latest = health_monitor.latest("ragflow")
+    if latest is None or not latest.online:
+        return None
+    return latest.detail
+
+
+@router.get("/replicas", response_model=List[ReplicaStatus])
+async def get_replica_status():
+    return replica_router.status()
+
+
+POSTGRES_STATUS_SQL = text(
+    """
+    WITH connections AS (
+        SELECT
+            count(*) AS total_connections,
+            count(*) FILTER (WHERE state = 'active') AS active_connections
+        FROM pg_stat_activity
+    ),
+    top_tables AS (
+        SELECT
+            schemaname,
+            relname,
+            seq_scan,
+            seq_tup_read,
+            idx_scan,
+            idx_tup_fetch,
+            n_tup_ins,
+            n_tup_upd,
+            n_tup_del,
+            n_live_tup,
+            n_dead_tup
+        FROM pg_stat_user_tables
+        ORDER BY n_live_tup DESC
+        LIMIT 10
+    )
+    SELECT
+        version() AS version,
+        date_trunc('second', current_timestamp - pg_postmaster_start_time())
+            AS uptime,
+        connections.total_connections,
+        connections.active_connections,
+        current_setting('max_connections')::int AS max_connections,
+        pg_size_pretty(pg_database_size(current_database())) AS database_size,
+        (
+            SELECT count(*) FROM information_schema.tables
+            WHERE table_schema NOT IN ('pg_catalog', 'information_schema')
+        ) AS tables_count,
+        (
+            SELECT COALESCE(json_agg(top_tables ORDER BY n_live_tup DESC), '[]')
+            FROM top_tables
+        )::text AS top_tables
+    FROM connections
+    """
+)
 
+postgres_status_cache: LRUCache[PostgresStatus] = LRUCache(
+    max_entries=1, ttl=float(os.getenv("POSTGRES_STATUS_CACHE_TTL", "5"))
+)
 
-@router.get("/postgres", response_model=PostgresStatus)
-async def get_postgres_status(db: Session = Depends(get_db)):
-    status = PostgresStatus(is_connected=False)
 
-    try:
-        version_result = db.execute(text("SELECT version();")).scalar()
-        status.is_connected = True
-        status.version = version_result
+async def load_postgres_status(db: AsyncSession) -> PostgresStatus:
+    row = (await db.execute(POSTGRES_STATUS_SQL)).one()
+    result = PostgresStatus(
+        is_connected=True,
+        version=row.version,
+        uptime=str(row.uptime),
+        current_connections=row.total_connections,
+        active_connections=row.active_connections,
+        max_connections=row.max_connections,
+        database_size=row.database_size,
+        tables_count=row.tables_count,
+        detailed_stats={"top_tables": json.loads(row.top_tables)},
+    )
+    if result.max_connections:
+        result.connection_usage_percent = (
+            result.current_connections / result.max_connections
+        ) * 100
+    return result
 
-        uptime_result = db.execute(
-            text(
-                "SELECT date_trunc('second', current_timestamp - pg_postmaster_start_time()) as uptime;"
-            )
-        ).scalar()
-        status.uptime = str(uptime_result)
-
-        connection_stats = db.execute(
-            text(
-                """
-            SELECT 
-                count(*) as total_connections,
-                sum(CASE WHEN state = 'active' THEN 1 ELSE 0 END) as active_connections,
-                (SELECT setting::int FROM pg_settings WHERE name = 'max_connections') as max_connections
-            FROM pg_stat_activity;
-        """
-            )
-        ).first()
-
-        if connection_stats:
-            status.current_connections = connection_stats[0]
-            status.active_connections = connection_stats[1]
-            status.max_connections = connection_stats[2]
-
-            if status.max_connections:
-                status.connection_usage_percent = (
-                    status.current_connections / status.max_connections
-                ) * 100
-
-        db_size_result = db.execute(
-            text(
-                """
-            SELECT pg_size_pretty(pg_database_size(current_database())) as db_size;
-        """
-            )
-        ).scalar()
-        status.database_size = db_size_result
-
-        tables_count = db.execute(
-            text(
-                """
-            SELECT count(*) FROM information_schema.tables 
-            WHERE table_schema NOT IN ('pg_catalog', 'information_schema');
-        """
+
+@router.get("/postgres", response_model=PostgresStatus)
+async def get_postgres_status(db: AsyncSession = Depends(get_read_db)):
+    result = postgres_status_cache.get("postgres")
+    if result is None:
+        try:
+            result = await load_postgres_status(db)
+        except exc.SQLAlchemyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=f"Database connection error: {str(e)}",
             )
-        ).scalar()
-        status.tables_count = tables_count
-
-        detailed_stats = {}
-
-        table_stats = db.execute(
-            text(
-                """
-            SELECT
-                schemaname,
-                relname,
-                seq_scan,
-                seq_tup_read,
-                idx_scan,
-                idx_tup_fetch,
-                n_tup_ins,
-                n_tup_upd,
-                n_tup_del,
-                n_live_tup,
-                n_dead_tup
-            FROM pg_stat_user_tables
-            ORDER BY n_live_tup DESC
-            LIMIT 10;
-        """
+        except Exception as e:
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Error retrieving database status: {str(e)}",
             )
-        )
-
-        detailed_stats["top_tables"] = [dict(row._mapping) for row in table_stats]
-
-        status.detailed_stats = detailed_stats
-
-    except exc.SQLAlchemyError as e:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Database connection error: {str(e)}",
-        )
-    except Exception as e:
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail=f"Error retrieving database status: {str(e)}",
-        )
-
-    return status
+        postgres_status_cache.put("postgres", result)
+
+    return result.model_copy(
+        update={
+            "pools": {
+                name: PoolStatus(**statistics)
+                for name, statistics in pool_statistics().items()
+            }
+        }
+    )
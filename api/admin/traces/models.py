@@ -0,0 +1,30 @@
+from typing import Any, Dict, List, Optional
+
+from pydantic import BaseModel
+
+
+class SpanResponse(BaseModel):
+    span_id: str
+    parent_id: Optional[str] = None
+    name: str
+    kind: str
+    depth: int
+    offset_ms: float
+    duration_ms: Optional[float] = None
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = {}
+
+
+class TraceResponse(BaseModel):
+    trace_id: str
+    name: str
+    started_at: float
+    duration_ms: Optional[float] = None
+    status: Optional[int] = None
+    dropped_spans: int = 0
+    attributes: Dict[str, Any] = {}
+    spans: List[SpanResponse] = []
+
+
+class TraceListResponse(BaseModel):
+    traces: List[TraceResponse]
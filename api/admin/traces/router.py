@@ -0,0 +1,72 @@
+from typing import Dict, Optional
+
+from fastapi import APIRouter, HTTPException, Query, status
+
+from api.admin.traces.models import SpanResponse, TraceListResponse, TraceResponse
+from services.tracing import Span, Trace, tracer
+
+router = APIRouter(
+    prefix="/traces",
+)
+
+
+def _milliseconds(seconds: Optional[float]) -> Optional[float]:
+    return seconds * 1000 if seconds is not None else None
+
+
+def create_trace_response(trace: Trace) -> TraceResponse:
+    depths: Dict[str, int] = {trace.root.span_id: 0}
+    spans = sorted(trace.spans, key=lambda span: span.start)
+
+    def depth(span: Span) -> int:
+        if span.span_id not in depths:
+            depths[span.span_id] = 1 + depths.get(span.parent_id, 0)
+        return depths[span.span_id]
+
+    return TraceResponse(
+        trace_id=trace.trace_id,
+        name=trace.name,
+        started_at=trace.start,
+        duration_ms=_milliseconds(trace.duration),
+        status=trace.status,
+        dropped_spans=trace.dropped_spans,
+        attributes=trace.root.attributes,
+        spans=[
+            SpanResponse(
+                span_id=span.span_id,
+                parent_id=span.parent_id,
+                name=span.name,
+                kind=span.kind,
+                depth=depth(span),
+                offset_ms=(span.start - trace.start) * 1000,
+                duration_ms=_milliseconds(span.duration),
+                error=span.error,
+                attributes=span.attributes,
+            )
+            for span in spans
+        ],
+    )
+
+
+@router.get("/", response_model=TraceListResponse)
+async def get_slowest_traces(
+    limit: int = Query(20, ge=1, le=200),
+    min_duration_ms: float = Query(0, ge=0),
+):
+    return TraceListResponse(
+        traces=[
+            create_trace_response(trace)
+            for trace in tracer.slowest(limit, min_duration=min_duration_ms / 1000)
+        ]
+    )
+
+
+@router.get("/{trace_id}", response_model=TraceResponse)
+async def get_trace(trace_id: str):
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Trace not found",
+        )
+    return create_trace_response(trace)
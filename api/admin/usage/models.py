@@ -0,0 +1,14 @@
+from typing import List, Optional
+
+from pydantic import BaseModel
+
+
+class UsagePoint(BaseModel):
+    bucket: str
+    metric: str
+    count: int
+
+
+class UsageSeriesResponse(BaseModel):
+    points: List[UsagePoint]
+    refreshed_until: Optional[str] = None
@@ -0,0 +1,93 @@
+import datetime
+import uuid
+from typing import Optional, Type, Union
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from api.admin.usage.models import UsagePoint, UsageSeriesResponse
+from db.database import get_read_db
+from db.models import UsageDailyRollup, UsageHourlyRollup, UsageRollupWatermark
+from services.usage_counter import UsageMetric
+from services.usage_events import ROLLUP_WATERMARK
+
+router = APIRouter(
+    prefix="/usage",
+)
+
+
+async def usage_series(
+    db: AsyncSession,
+    rollup: Union[Type[UsageHourlyRollup], Type[UsageDailyRollup]],
+    start: datetime.date,
+    end: datetime.date,
+    user_id: Optional[uuid.UUID],
+    metric: Optional[str],
+) -> UsageSeriesResponse:
+    if metric is not None and metric not in UsageMetric.__members__:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown metric",
+        )
+
+    query = select(rollup.bucket, rollup.metric, func.sum(rollup.count)).where(
+        rollup.bucket >= start, rollup.bucket < end
+    )
+    if user_id is not None:
+        query = query.where(rollup.user_id == user_id)
+    if metric is not None:
+        query = query.where(rollup.metric == metric)
+    rows = (
+        await db.execute(
+            query.group_by(rollup.bucket, rollup.metric).order_by(
+                rollup.bucket, rollup.metric
+            )
+        )
+    ).all()
+
+    refreshed_until = await db.scalar(
+        select(UsageRollupWatermark.refreshed_until).where(
+            UsageRollupWatermark.name == ROLLUP_WATERMARK
+        )
+    )
+    return UsageSeriesResponse(
+        points=[
+            UsagePoint(bucket=bucket.isoformat(), metric=metric, count=count)
+            for bucket, metric, count in rows
+        ],
+        refreshed_until=refreshed_until.isoformat() if refreshed_until else None,
+    )
+
+
+@router.get("/hourly", response_model=UsageSeriesResponse)
+async def get_hourly_usage(
+    start: Optional[datetime.datetime] = None,
+    end: Optional[datetime.datetime] = None,
+    user_id: Optional[uuid.UUID] = None,
+    metric: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    end = end or datetime.datetime.now(datetime.timezone.utc)
+    start = start or end - datetime.timedelta(days=1)
+    return await usage_series(db, UsageHourlyRollup, start, end, user_id, metric)
+
+
+@router.get("/daily", response_model=UsageSeriesResponse)
+async def get_daily_usage(
+    start: Optional[datetime.date] = None,
+    end: Optional[datetime.date] = None,
+    user_id: Optional[uuid.UUID] = None,
+    metric: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    end = end or datetime.datetime.now(datetime.timezone.utc).date()
+    start = start or end - datetime.timedelta(days=30)
+    return await usage_series(
+        db,
+        UsageDailyRollup,
+        start,
+        end + datetime.timedelta(days=1),
+        user_id,
+        metric,
+    )
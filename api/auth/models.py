@@ -1,3 +1,4 @@
+import enum
 from typing import Optional
 
 from pydantic import BaseModel, EmailStr
@@ -25,6 +26,10 @@ class UserResponse(BaseModel):
     type: UserType
 
 
+class UpdateUserResponse(UserResponse):
+    token: Optional[str] = None
+
+
 class TokenResponse(BaseModel):
     token: str
     user: UserResponse
@@ -47,7 +52,23 @@ class UserStatisticsResponse(BaseModel):
 class UserWithStatisticsResponse(BaseModel):
     user: UserResponse
     statistics: UserStatisticsResponse
-    
-    
+
+
+class UserSortField(str, enum.Enum):
+    created_at = "created_at"
+    email = "email"
+    conversation_count = "conversation_count"
+    ocr_recognition_count = "ocr_recognition_count"
+    knowledge_base_search_count = "knowledge_base_search_count"
+    flow_chart_count = "flow_chart_count"
+    mind_map_count = "mind_map_count"
+
+
+class SortOrder(str, enum.Enum):
+    asc = "asc"
+    desc = "desc"
+
+
 class AllUsersResponse(BaseModel):
     users: list[UserWithStatisticsResponse]
+    next_cursor: Optional[str] = None
@@ -1,37 +1,51 @@
+import math
 import os
+import uuid
 from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
 import jwt
 from dotenv import load_dotenv
-from fastapi import APIRouter, Depends, HTTPException, status
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import func, insert, or_, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.auth.models import (
     AllUsersResponse,
     LoginRequest,
     RegisterRequest,
+    SortOrder,
     TokenResponse,
     UpdateUserRequest,
+    UpdateUserResponse,
     UserResponse,
+    UserSortField,
     UserStatisticsResponse,
     UserWithStatisticsResponse,
 )
-from db.database import get_db
+from db.database import get_async_db, get_read_db, replica_router
+from db.pagination import InvalidCursorError, decode_cursor, encode_cursor
 from db.models import User, UserStatistics, UserType
-from middlewares.auth import admin_only_middleware, auth_middleware
+from middlewares.auth import (
+    CurrentUser,
+    admin_only_middleware,
+    auth_middleware,
+    get_user_read_db,
+    invalidate_user,
+)
+from services.password_service import PasswordServiceBusyError
+from services.uni import login_throttle, password_service, usage_counter
 
 load_dotenv()
 
 router = APIRouter(prefix="/auth")
-password_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 JWT_SECRET = os.getenv("JWT_SECRET")
 if not JWT_SECRET:
     raise RuntimeError("JWT_SECRET environment variable not set")
 
 
-def create_user_response(user: User) -> UserResponse:
+def create_user_response(user: User | CurrentUser) -> UserResponse:
     return UserResponse(
         id=str(user.id),
         email=user.email,
@@ -52,44 +66,78 @@ def create_user_statistics_response(stats: UserStatistics) -> UserStatisticsResp
     )
 
 
-def generate_jwt_token(user_id: str) -> str:
+async def hash_password(password: str) -> str:
+    try:
+        return await password_service.hash(password)
+    except PasswordServiceBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please try again later",
+        )
+
+
+async def verify_password(
+    password: str, password_hash: Optional[str]
+) -> Tuple[bool, Optional[str]]:
+    try:
+        if password_hash is None:
+            await password_service.verify_dummy(password)
+            return False, None
+        return await password_service.verify_and_update(password, password_hash)
+    except PasswordServiceBusyError:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Server busy, please try again later",
+        )
+
+
+def generate_jwt_token(user: User) -> str:
     return jwt.encode(
-        {"sub": user_id, "exp": datetime.now() + timedelta(days=30)},
+        {
+            "sub": str(user.id),
+            "role": user.type.value,
+            "ver": user.token_version,
+            "exp": datetime.now() + timedelta(days=30),
+        },
         JWT_SECRET,
         algorithm="HS256",
     )
 
 
 @router.post("/register", response_model=TokenResponse)
-async def register(account: RegisterRequest, db: Session = Depends(get_db)):
+async def register(
+    account: RegisterRequest, db: AsyncSession = Depends(get_async_db)
+):
     if len(account.password) < 8:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Password must be at least 8 characters long",
         )
 
-    if db.query(User).filter(User.email == account.email).first():
+    if await db.scalar(select(User).where(User.email == account.email)):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered",
         )
 
+    password_hash = await hash_password(account.password)
     try:
         user = User(
             email=account.email,
-            password_hash=password_context.hash(account.password),
+            password_hash=password_hash,
             nickname=account.nickname,
             type=UserType.user,
         )
         db.add(user)
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        await db.refresh(user)
 
         user_stats = UserStatistics(user_id=user.id)
         db.add(user_stats)
-        db.commit()
+        await db.commit()
+        replica_router.pin(user.id)
 
-        token = generate_jwt_token(str(user.id))
+        token = generate_jwt_token(user)
         return TokenResponse(
             token=token,
             user=create_user_response(user),
@@ -97,7 +145,7 @@ async def register(account: RegisterRequest, db: Session = Depends(get_db)):
 
     except Exception as e:
         print(e, flush=True)
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error",
@@ -105,21 +153,42 @@ async def register(account: RegisterRequest, db: Session = Depends(get_db)):
 
 
 @router.post("/login", response_model=TokenResponse)
-async def login(account: LoginRequest, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.email == account.email).first()
-    if not user:
+async def login(
+    account: LoginRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+):
+    retry_after = await login_throttle.check(
+        request.client.host if request.client else None, account.email
+    )
+    if retry_after > 0:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Invalid email or password",
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many login attempts, please try again later",
+            headers={"Retry-After": str(math.ceil(retry_after))},
         )
 
-    if not password_context.verify(account.password, user.password_hash):
+    user = await db.scalar(select(User).where(User.email == account.email))
+    is_valid, new_password_hash = await verify_password(
+        account.password, user.password_hash if user else None
+    )
+    if not user or not is_valid:
+        await login_throttle.record_failure(account.email)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
         )
 
-    token = generate_jwt_token(str(user.id))
+    await login_throttle.record_success(account.email)
+    if new_password_hash:
+        try:
+            user.password_hash = new_password_hash
+            await db.commit()
+            await db.refresh(user)
+        except Exception:
+            await db.rollback()
+
+    token = generate_jwt_token(user)
     return TokenResponse(
         token=token,
         user=create_user_response(user),
@@ -127,17 +196,15 @@ async def login(account: LoginRequest, db: Session = Depends(get_db)):
 
 
 @router.get("/me", response_model=UserResponse)
-async def get_current_user(
-    db: Session = Depends(get_db), user: User = Depends(auth_middleware)
-):
+async def get_current_user(user: CurrentUser = Depends(auth_middleware)):
     return create_user_response(user)
 
 
-@router.put("/me", response_model=UserResponse)
+@router.put("/me", response_model=UpdateUserResponse)
 async def update_user(
     user_data: UpdateUserRequest,
-    db: Session = Depends(get_db),
-    user: User = Depends(auth_middleware),
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CurrentUser = Depends(auth_middleware),
 ):
     if user_data.password and len(user_data.password) < 8:
         raise HTTPException(
@@ -145,13 +212,17 @@ async def update_user(
             detail="Password must be at least 8 characters long",
         )
     try:
+        user = await db.scalar(select(User).where(User.id == current_user.id))
+        if not user:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail="User not found",
+            )
         if user_data.nickname:
             user.nickname = user_data.nickname
         if user_data.email:
-            existing_user = (
-                db.query(User)
-                .filter(User.email == user_data.email, User.id != user.id)
-                .first()
+            existing_user = await db.scalar(
+                select(User).where(User.email == user_data.email, User.id != user.id)
             )
             if existing_user:
                 raise HTTPException(
@@ -160,14 +231,20 @@ async def update_user(
                 )
             user.email = user_data.email
         if user_data.password:
-            user.password_hash = password_context.hash(user_data.password)
-        db.commit()
-        db.refresh(user)
-        return create_user_response(user)
+            user.password_hash = await hash_password(user_data.password)
+            user.token_version += 1
+        await db.commit()
+        await db.refresh(user)
+        replica_router.pin(user.id)
+        invalidate_user(user.id)
+        return UpdateUserResponse(
+            **create_user_response(user).model_dump(),
+            token=generate_jwt_token(user) if user_data.password else None,
+        )
     except HTTPException:
         raise
     except Exception:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error",
@@ -176,39 +253,127 @@ async def update_user(
 
 @router.get("/statistics", response_model=UserStatisticsResponse)
 async def get_user_statistics(
-    db: Session = Depends(get_db), user: User = Depends(auth_middleware)
+    db: AsyncSession = Depends(get_user_read_db),
+    user: CurrentUser = Depends(auth_middleware),
 ):
-    user_stats = (
-        db.query(UserStatistics).filter(UserStatistics.user_id == user.id).first()
+    user_stats = await db.scalar(
+        select(UserStatistics).where(UserStatistics.user_id == user.id)
     )
+    pending = usage_counter.pending(user.id)
     return UserStatisticsResponse(
-        knowledge_base_search_count=user_stats.knowledge_base_search_count,
-        ocr_recognition_count=user_stats.ocr_recognition_count,
-        conversation_count=user_stats.conversation_count,
-        flow_chart_count=user_stats.flow_chart_count,
-        mind_map_count=user_stats.mind_map_count,
+        **{
+            metric.value: getattr(user_stats, metric.value) + delta
+            for metric, delta in pending.items()
+        }
     )
 
 
 @router.get("/", response_model=AllUsersResponse)
 async def get_all_users(
-    db: Session = Depends(get_db), _: None = Depends(admin_only_middleware)
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    sort_by: UserSortField = UserSortField.created_at,
+    order: SortOrder = SortOrder.desc,
+    search: Optional[str] = None,
+    type: Optional[UserType] = None,
+    primary: AsyncSession = Depends(get_async_db),
+    db: AsyncSession = Depends(get_read_db),
+    _: None = Depends(admin_only_middleware),
 ):
-    users = db.query(User).all()
-    result = []
-    
-    for user in users:
-        user_stats = db.query(UserStatistics).filter(UserStatistics.user_id == user.id).first()
-        if not user_stats:
-            user_stats = UserStatistics(user_id=user.id)
-            db.add(user_stats)
-            db.commit()
-            db.refresh(user_stats)
-            
-        user_with_stats = UserWithStatisticsResponse(
-            user=create_user_response(user),
-            statistics=create_user_statistics_response(user_stats)
+    if cursor is None:
+        try:
+            backfill = await primary.execute(
+                insert(UserStatistics).from_select(
+                    ["user_id"],
+                    select(User.id)
+                    .outerjoin(UserStatistics, UserStatistics.user_id == User.id)
+                    .where(UserStatistics.id.is_(None)),
+                    include_defaults=False,
+                )
+            )
+            await primary.commit()
+        except Exception:
+            await primary.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail="Internal server error",
+            )
+        if backfill.rowcount:
+            db = primary
+
+    if sort_by == UserSortField.created_at:
+        sort_column = User.created_at
+    elif sort_by == UserSortField.email:
+        sort_column = User.email
+    else:
+        sort_column = func.coalesce(getattr(UserStatistics, sort_by.value), 0)
+
+    query = select(User, UserStatistics).outerjoin(
+        UserStatistics, UserStatistics.user_id == User.id
+    )
+    if search:
+        pattern = f"%{search}%"
+        query = query.where(
+            or_(User.email.ilike(pattern), User.nickname.ilike(pattern))
         )
-        result.append(user_with_stats)
-    
-    return AllUsersResponse(users=result)
\ No newline at end of file
+    if type is not None:
+        query = query.where(User.type == type)
+
+    if cursor is not None:
+        try:
+            value, user_id = decode_cursor(cursor)
+            if sort_by == UserSortField.created_at:
+                value = datetime.fromisoformat(value)
+            elif sort_by != UserSortField.email:
+                value = int(value)
+            user_id = uuid.UUID(user_id)
+        except (InvalidCursorError, TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor",
+            )
+        key = tuple_(sort_column, User.id)
+        query = query.where(
+            key < tuple_(value, user_id)
+            if order == SortOrder.desc
+            else key > tuple_(value, user_id)
+        )
+
+    if order == SortOrder.desc:
+        query = query.order_by(sort_column.desc(), User.id.desc())
+    else:
+        query = query.order_by(sort_column.asc(), User.id.asc())
+    rows = (await db.execute(query.limit(limit + 1))).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last_user, last_stats = rows[-1]
+        if sort_by == UserSortField.created_at:
+            last_value = last_user.created_at.isoformat()
+        elif sort_by == UserSortField.email:
+            last_value = last_user.email
+        else:
+            last_value = getattr(last_stats, sort_by.value, 0) if last_stats else 0
+        next_cursor = encode_cursor([last_value, str(last_user.id)])
+
+    return AllUsersResponse(
+        users=[
+            UserWithStatisticsResponse(
+                user=create_user_response(user),
+                statistics=(
+                    create_user_statistics_response(user_stats)
+                    if user_stats
+                    else UserStatisticsResponse(
+                        conversation_count=0,
+                        ocr_recognition_count=0,
+                        knowledge_base_search_count=0,
+                        flow_chart_count=0,
+                        mind_map_count=0,
+                    )
+                ),
+            )
+            for user, user_stats in rows
+        ],
+        next_cursor=next_cursor,
+    )
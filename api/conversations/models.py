@@ -1,4 +1,4 @@
-from typing import List
+from typing import List, Optional
 
 from pydantic import BaseModel, Field
 
@@ -10,6 +10,15 @@ class ConversationResponse(BaseModel):
     updated_at: str
 
 
+class ConversationListResponse(BaseModel):
+    conversations: List[ConversationResponse]
+    next_cursor: Optional[str] = None
+
+
+class DeleteConversationResponse(BaseModel):
+    id: str
+
+
 class DetailedConversationResponse(ConversationResponse):
     latest_message: str
 
@@ -1,27 +1,41 @@
 import asyncio
+import contextvars
 import datetime
 import json
 import time
 import uuid
-from typing import List
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from fastapi.responses import StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from api.conversations.models import (
     ConversationDetailResponse,
+    ConversationListResponse,
     ConversationResponse,
+    DeleteConversationResponse,
     DetailedConversationResponse,
     MessageRequest,
     MessageResponse,
     ReferenceChunkResponse,
 )
-from db.database import get_db
-from db.models import Conversation, User, UserStatistics
-from middlewares.auth import auth_middleware
+from db.database import AsyncSessionLocal, get_async_db, replica_router
+from db.models import Conversation
+from db.pagination import InvalidCursorError, decode_cursor, encode_cursor
+from middlewares.auth import CurrentUser, auth_middleware, get_user_read_db
+from services.circuit_breaker import CircuitOpenError, check_circuit
 from services.llm_service import Message, Role
-from services.uni import LLM_MODEL, RAG_CHAT_ID, llm_service, rag_service
+from services.tracing import tracer
+from services.uni import (
+    LLM_MODEL,
+    RAG_CHAT_ID,
+    llm_service,
+    rag_service,
+    usage_counter,
+)
+from services.usage_counter import UsageMetric
 
 router = APIRouter(prefix="/conversations")
 
@@ -80,56 +94,96 @@ def generate_title(question: str) -> str:
 async def update_conversation_title(
     user_id: uuid.UUID, conversation_id: uuid.UUID, title: str
 ):
-    db = next(get_db())
-    try:
-        conversation = (
-            db.query(Conversation)
-            .filter(
-                Conversation.id == conversation_id,
-                Conversation.user_id == user_id,
+    async with AsyncSessionLocal() as db:
+        try:
+            conversation = await db.scalar(
+                select(Conversation).where(
+                    Conversation.id == conversation_id,
+                    Conversation.user_id == user_id,
+                )
             )
-            .first()
-        )
-        if conversation:
-            conversation.title = title
-            db.commit()
-    except:
-        db.rollback()
-    finally:
-        db.close()
+            if conversation:
+                conversation.title = title
+                await db.commit()
+                replica_router.pin(user_id)
+        except:
+            await db.rollback()
+
+
+CONVERSATION_COLUMNS = (
+    Conversation.id,
+    Conversation.title,
+    Conversation.created_at,
+    Conversation.updated_at,
+)
 
 
-@router.get("/", response_model=List[ConversationResponse])
+@router.get("/", response_model=ConversationListResponse)
 async def get_conversations(
-    user: User = Depends(auth_middleware), db: Session = Depends(get_db)
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    user: CurrentUser = Depends(auth_middleware),
+    db: AsyncSession = Depends(get_user_read_db),
 ):
-    conversations = db.query(Conversation).filter(Conversation.user_id == user.id).all()
-    return [
-        ConversationResponse(
-            id=str(conversation.id),
-            title=conversation.title,
-            created_at=str(conversation.created_at),
-            updated_at=str(conversation.updated_at),
+    query = select(*CONVERSATION_COLUMNS).where(Conversation.user_id == user.id)
+    if cursor is not None:
+        try:
+            updated_at, conversation_id = decode_cursor(cursor)
+            updated_at = datetime.datetime.fromisoformat(updated_at)
+            conversation_id = uuid.UUID(conversation_id)
+        except (InvalidCursorError, TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor",
+            )
+        query = query.where(
+            tuple_(Conversation.updated_at, Conversation.id)
+            < tuple_(updated_at, conversation_id)
         )
-        for conversation in conversations
-    ]
+    rows = (
+        await db.execute(
+            query.order_by(
+                Conversation.updated_at.desc(), Conversation.id.desc()
+            ).limit(limit + 1)
+        )
+    ).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor([rows[-1].updated_at.isoformat(), str(rows[-1].id)])
+
+    return ConversationListResponse(
+        conversations=[
+            ConversationResponse(
+                id=str(row.id),
+                title=row.title,
+                created_at=str(row.created_at),
+                updated_at=str(row.updated_at),
+            )
+            for row in rows
+        ],
+        next_cursor=next_cursor,
+    )
 
 
 @router.get("/detailed", response_model=List[DetailedConversationResponse])
 async def get_conversations_detailed(
-    user: User = Depends(auth_middleware), db: Session = Depends(get_db)
+    user: CurrentUser = Depends(auth_middleware),
+    db: AsyncSession = Depends(get_user_read_db),
 ):
     recent_conversations = (
-        db.query(Conversation)
-        .filter(Conversation.user_id == user.id)
-        .order_by(Conversation.updated_at.desc())
-        .limit(3)
-        .all()
-    )
+        await db.execute(
+            select(*CONVERSATION_COLUMNS)
+            .where(Conversation.user_id == user.id)
+            .order_by(Conversation.updated_at.desc())
+            .limit(3)
+        )
+    ).all()
 
     result = []
     for conversation in recent_conversations:
-        messages = rag_service.get_conversation_messages(
+        messages = await rag_service.get_conversation_messages(
             chat_id=RAG_CHAT_ID,
             user_id=str(user.id),
             conversation_id=str(conversation.id),
@@ -160,14 +214,17 @@ async def get_conversations_detailed(
 
 @router.post("/", response_model=ConversationResponse)
 async def create_conversation(
-    user: User = Depends(auth_middleware), db: Session = Depends(get_db)
+    user: CurrentUser = Depends(auth_middleware),
+    db: AsyncSession = Depends(get_async_db),
 ):
+    check_circuit("ragflow")
     try:
         conversation = Conversation(user_id=user.id, title="新会话")
         db.add(conversation)
-        db.commit()
-        db.refresh(conversation)
-        rag_service.create_conversation(
+        await db.commit()
+        await db.refresh(conversation)
+        replica_router.pin(user.id)
+        await rag_service.create_conversation(
             chat_id=RAG_CHAT_ID,
             user_id=str(user.id),
             conversation_id=str(conversation.id),
@@ -180,7 +237,7 @@ async def create_conversation(
             updated_at=str(conversation.updated_at),
         )
     except:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error",
@@ -190,17 +247,15 @@ async def create_conversation(
 @router.get("/{conversation_id}", response_model=ConversationDetailResponse)
 async def get_conversation(
     conversation_id: str,
-    user: User = Depends(auth_middleware),
-    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(auth_middleware),
+    db: AsyncSession = Depends(get_user_read_db),
 ):
     try:
-        conversation = (
-            db.query(Conversation)
-            .filter(
+        conversation = await db.scalar(
+            select(Conversation).where(
                 Conversation.id == uuid.UUID(conversation_id),
                 Conversation.user_id == user.id,
             )
-            .first()
         )
 
         if not conversation:
@@ -209,7 +264,7 @@ async def get_conversation(
                 detail="Conversation not found",
             )
 
-        messages = rag_service.get_conversation_messages(
+        messages = await rag_service.get_conversation_messages(
             chat_id=RAG_CHAT_ID,
             user_id=str(user.id),
             conversation_id=str(conversation.id),
@@ -237,65 +292,56 @@ async def get_conversation(
                 for message in messages
             ],
         )
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error",
         )
 
 
-@router.delete("/{conversation_id}", response_model=List[ConversationResponse])
+@router.delete("/{conversation_id}", response_model=DeleteConversationResponse)
 async def delete_conversation(
     conversation_id: str,
-    user: User = Depends(auth_middleware),
-    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(auth_middleware),
+    db: AsyncSession = Depends(get_async_db),
 ):
 
     try:
-        conversation = (
-            db.query(Conversation)
-            .filter(
+        deleted_id = await db.scalar(
+            select(Conversation.id).where(
                 Conversation.id == uuid.UUID(conversation_id),
                 Conversation.user_id == user.id,
             )
-            .first()
         )
 
-        if not conversation:
+        if not deleted_id:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Conversation not found",
             )
 
-        rag_service.delete_conversation(
+        await rag_service.delete_conversation(
             chat_id=RAG_CHAT_ID,
             user_id=str(user.id),
-            conversation_id=str(conversation.id),
+            conversation_id=str(deleted_id),
         )
 
-        db.delete(conversation)
-        db.commit()
-
-        conversations = (
-            db.query(Conversation).filter(Conversation.user_id == user.id).all()
+        await db.execute(
+            delete(Conversation).where(
+                Conversation.id == deleted_id, Conversation.user_id == user.id
+            )
         )
+        await db.commit()
+        replica_router.pin(user.id)
 
-        return [
-            ConversationResponse(
-                id=str(conversation.id),
-                title=conversation.title,
-                created_at=str(conversation.created_at),
-                updated_at=str(conversation.updated_at),
-            )
-            for conversation in conversations
-        ]
-    except HTTPException:
+        return DeleteConversationResponse(id=str(deleted_id))
+    except (HTTPException, CircuitOpenError):
         raise
     except:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error",
@@ -306,23 +352,22 @@ async def delete_conversation(
 async def chat(
     message: MessageRequest,
     conversation_id: str,
-    user: User = Depends(auth_middleware),
-    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(auth_middleware),
+    db: AsyncSession = Depends(get_async_db),
 ):
     if not message.question.strip():
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Question cannot be empty",
         )
+    check_circuit("ragflow")
 
     try:
-        conversation = (
-            db.query(Conversation)
-            .filter(
+        conversation = await db.scalar(
+            select(Conversation).where(
                 Conversation.id == uuid.UUID(conversation_id),
                 Conversation.user_id == user.id,
             )
-            .first()
         )
 
         if not conversation:
@@ -331,12 +376,10 @@ async def chat(
                 detail="Conversation not found",
             )
 
-        user_stats = (
-            db.query(UserStatistics).filter(UserStatistics.user_id == user.id).first()
-        )
-        user_stats.conversation_count += 1
+        usage_counter.increment(user.id, UsageMetric.conversation)
         conversation.updated_at = datetime.datetime.now()
-        db.commit()
+        await db.commit()
+        replica_router.pin(user.id)
 
         need_title_update = conversation.title == "新会话"
 
@@ -346,15 +389,21 @@ async def chat(
         async def event_stream():
             loop = asyncio.get_event_loop()
             related_questions_future = loop.run_in_executor(
-                None, generate_related_questions, message.question
+                None,
+                contextvars.copy_context().run,
+                generate_related_questions,
+                message.question,
             )
 
             if need_title_update:
                 title_future = loop.run_in_executor(
-                    None, generate_title, message.question
+                    None,
+                    contextvars.copy_context().run,
+                    generate_title,
+                    message.question,
                 )
 
-            generator, references, complete_message = rag_service.chat(
+            generator, references, complete_message = await rag_service.chat(
                 chat_id=RAG_CHAT_ID,
                 user_id=str(user_id),
                 conversation_id=str(conversation_id),
@@ -363,11 +412,8 @@ async def chat(
 
             prev_content = None
             prev_time = None
-            while True:
-                chunk = await loop.run_in_executor(None, next, generator, None)
-                if chunk is None:
-                    break
-
+            pacing = 0.0
+            async for chunk in generator:
                 current_time = time.time()
                 if prev_content is not None:
                     content_blocks = [
@@ -384,6 +430,7 @@ async def chat(
                         yield f"data: {json.dumps({'type': 'content', 'role': 'assistant', 'content': blocks})}\n\n"
                         if i < num_blocks - 1 and send_interval > 0:
                             await asyncio.sleep(send_interval)
+                            pacing += send_interval
 
                 prev_content = chunk
                 prev_time = current_time
@@ -402,6 +449,9 @@ async def chat(
                     yield f"data: {json.dumps(data)}\n\n"
                     if i < len(content_blocks) - 1 and fixed_interval > 0:
                         await asyncio.sleep(fixed_interval)
+                        pacing += fixed_interval
+
+            tracer.annotate(sse_pacing_seconds=pacing)
 
             if references and complete_message:
                 data = {
@@ -411,7 +461,8 @@ async def chat(
                 }
                 yield f"data: {json.dumps(data)}\n\n"
 
-            related_questions = await related_questions_future
+            with tracer.span("chat.related_questions.wait"):
+                related_questions = await related_questions_future
             data = {
                 "type": "related_questions",
                 "related_questions": related_questions,
@@ -419,7 +470,8 @@ async def chat(
             yield f"data: {json.dumps(data)}\n\n"
 
             if need_title_update and title_future:
-                title = await title_future
+                with tracer.span("chat.title.wait"):
+                    title = await title_future
                 data = {
                     "type": "title",
                     "title": title,
@@ -431,10 +483,10 @@ async def chat(
             content=event_stream(),
             media_type="text/event-stream",
         )
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error",
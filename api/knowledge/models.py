@@ -1,6 +1,6 @@
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class Dataset(BaseModel):
@@ -57,6 +57,10 @@ class ChunksResponse(PaginationResponse):
 
 class RetrievalResponse(PaginationResponse):
     chunks: List[ResultChunk]
+    chunk_count: int
+    timed_out_dataset_ids: List[str] = []
+    failed_dataset_ids: List[str] = []
+    is_fallback: bool = False
 
 
 class RetrievalRequest(BaseModel):
@@ -68,6 +72,8 @@ class RetrievalRequest(BaseModel):
     similarity_threshold: float = 0.2
     vector_similarity_weight: float = 0.3
     top_k: int = 1024
+    federated: bool = False
+    dataset_timeout: Optional[float] = Field(None, gt=0)
 
 
 class NodeProperties(BaseModel):
@@ -82,6 +88,8 @@ class Node(BaseModel):
     id: str
     labels: List[str]
     properties: NodeProperties
+    x: Optional[float] = None
+    y: Optional[float] = None
 
 
 class EdgeProperties(BaseModel):
@@ -1,8 +1,16 @@
-from typing import List
+import json
+from typing import List, Optional
 
-import requests
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    status,
+)
+from fastapi.responses import StreamingResponse
 
 from api.knowledge.models import (
     Chunk,
@@ -16,66 +24,91 @@ from api.knowledge.models import (
     RetrievalRequest,
     RetrievalResponse,
 )
-from db.database import get_db
-from db.models import User, UserStatistics
-from middlewares.auth import auth_middleware
-from services.uni import LIGHT_GRAPH_ENDPOINT, rag_service
+from middlewares.auth import CurrentUser, admin_only_middleware, auth_middleware
+from services.circuit_breaker import CircuitOpenError
+from services.graph_service import GraphPayload
+from services.ragflow_client import RAGFlowError
+from services.uni import (
+    graph_service,
+    ingestion_monitor,
+    knowledge_mirror,
+    rag_service,
+    usage_counter,
+)
+from services.usage_counter import UsageMetric
 
 router = APIRouter(prefix="/knowledge")
 
 
+def graph_payload_response(request: Request, payload: GraphPayload) -> Response:
+    headers = {
+        "ETag": payload.etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept-Encoding",
+    }
+    if payload.matches(request.headers.get("if-none-match")):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    body, content_encoding = payload.encode(request.headers.get("accept-encoding"))
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
 @router.get("/graph", response_model=GraphResponse)
 async def get_graph(
+    request: Request,
     label: str = "*",
-    max_depth: int = 3,
-    max_nodes: int = 1000,
+    max_depth: int = Query(3, ge=1, le=10),
+    max_nodes: int = Query(1000, ge=1, le=10000),
+    layout: bool = False,
     _: None = Depends(auth_middleware),
 ):
-    forward_url = f"{LIGHT_GRAPH_ENDPOINT}/graphs"
-    params = {"label": label, "max_depth": max_depth, "max_nodes": max_nodes}
+    if layout and max_nodes > graph_service.layout_max_nodes:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Layout is limited to {graph_service.layout_max_nodes} nodes",
+        )
 
     try:
-        response = requests.get(forward_url, params=params)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error fetching graph data",
-            )
-    except HTTPException:
+        payload = await graph_service.get_graph(
+            label, max_depth, max_nodes, layout=layout
+        )
+    except CircuitOpenError:
         raise
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error fetching graph data",
         )
+    return graph_payload_response(request, payload)
 
 
 @router.get("/graph/labels", response_model=List[str])
-async def get_graph_labels(_: None = Depends(auth_middleware)):
-    forward_url = f"{LIGHT_GRAPH_ENDPOINT}/graph/label/list"
-
+async def get_graph_labels(
+    request: Request,
+    prefix: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=1000),
+    _: None = Depends(auth_middleware),
+):
     try:
-        response = requests.get(forward_url)
-        if response.status_code == 200:
-            return response.json()
-        else:
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Error fetching graph labels",
-            )
-    except HTTPException:
+        payload = await graph_service.get_labels(prefix=prefix, limit=limit)
+    except CircuitOpenError:
         raise
     except Exception:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error fetching graph labels",
         )
+    return graph_payload_response(request, payload)
 
 
 @router.get("/", response_model=DatasetsResponse)
 async def get_datasets(_: None = Depends(auth_middleware)):
+    try:
+        datasets = await rag_service.list_datasets()
+    except (RAGFlowError, CircuitOpenError):
+        datasets = await knowledge_mirror.list_datasets()
     return DatasetsResponse(
         datasets=[
             Dataset(
@@ -84,7 +117,7 @@ async def get_datasets(_: None = Depends(auth_middleware)):
                 document_count=dataset.document_count,
                 chunk_count=dataset.chunk_count,
             )
-            for dataset in rag_service.list_datasets()
+            for dataset in datasets
         ]
     )
 
@@ -96,11 +129,26 @@ async def get_documents(
     page_size: int = 10,
     _: None = Depends(auth_middleware),
 ):
-    source_documents, document_count = rag_service.list_documents(
-        dataset_id=dataset_id,
-        page=page,
-        page_size=page_size,
-    )
+    try:
+        source_documents, document_count = await rag_service.list_documents(
+            dataset_id=dataset_id,
+            page=page,
+            page_size=page_size,
+        )
+    except (RAGFlowError, CircuitOpenError) as e:
+        mirrored = await knowledge_mirror.list_documents(
+            dataset_id=dataset_id,
+            page=page,
+            page_size=page_size,
+        )
+        if mirrored is None:
+            if isinstance(e, CircuitOpenError):
+                raise
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Error fetching documents",
+            )
+        source_documents, document_count = mirrored
     documents = [
         Document(
             id=document.id,
@@ -125,6 +173,52 @@ async def get_documents(
     )
 
 
+@router.get("/{dataset_id}/progress")
+async def get_ingestion_progress(
+    dataset_id: str,
+    _: None = Depends(auth_middleware),
+):
+    async def event_stream():
+        async for event in ingestion_monitor.events(dataset_id):
+            if event is None:
+                yield ": keep-alive\n\n"
+            else:
+                yield f"data: {json.dumps(event)}\n\n"
+
+    return StreamingResponse(
+        content=event_stream(),
+        media_type="text/event-stream",
+    )
+
+
+@router.get("/{dataset_id}/export")
+async def export_chunks(
+    dataset_id: str,
+    document_ids: Optional[List[str]] = Query(None),
+    _: None = Depends(admin_only_middleware),
+):
+    async def ndjson_stream():
+        async for document, chunk in rag_service.export_chunks(
+            dataset_id=dataset_id,
+            document_ids=document_ids,
+        ):
+            data = {
+                "dataset_id": dataset_id,
+                "document_id": document.id,
+                "document_name": document.name,
+                "id": chunk.id,
+                "available": chunk.available,
+                "content": chunk.content,
+            }
+            yield json.dumps(data, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(
+        content=ndjson_stream(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{dataset_id}.ndjson"'},
+    )
+
+
 @router.get("/{dataset_id}/{document_id}", response_model=ChunksResponse)
 async def get_chunks(
     dataset_id: str,
@@ -133,12 +227,27 @@ async def get_chunks(
     page_size: int = 10,
     _: None = Depends(auth_middleware),
 ):
-    source_chunks, chunk_count = rag_service.list_chunks(
+    mirrored = await knowledge_mirror.list_chunks(
         dataset_id=dataset_id,
         document_id=document_id,
         page=page,
         page_size=page_size,
     )
+    if mirrored is not None:
+        source_chunks, chunk_count = mirrored
+    else:
+        try:
+            source_chunks, chunk_count = await rag_service.list_chunks(
+                dataset_id=dataset_id,
+                document_id=document_id,
+                page=page,
+                page_size=page_size,
+            )
+        except RAGFlowError:
+            raise HTTPException(
+                status_code=status.HTTP_502_BAD_GATEWAY,
+                detail="Error fetching chunks",
+            )
     chunks = [
         Chunk(
             available=chunk.available,
@@ -162,26 +271,40 @@ async def get_chunks(
 @router.post("/retrieval", response_model=RetrievalResponse)
 async def retrieval(
     retrieval_request: RetrievalRequest,
-    user: User = Depends(auth_middleware),
-    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(auth_middleware),
 ):
-    user_stats = (
-        db.query(UserStatistics).filter(UserStatistics.user_id == user.id).first()
-    )
-    user_stats.knowledge_base_search_count += 1
-    db.commit()
+    usage_counter.increment(user.id, UsageMetric.knowledge_base_search)
 
-    return RetrievalResponse(
-        chunks=[
-            ResultChunk(
-                id=result_chunk.id,
-                content=result_chunk.content,
-                highlighted_content=result_chunk.highlighted_content,
-                similarity=result_chunk.similarity,
-                term_similarity=result_chunk.term_similarity,
-                vector_similarity=result_chunk.vector_similarity,
+    timed_out_dataset_ids: List[str] = []
+    failed_dataset_ids: List[str] = []
+    is_fallback = False
+    try:
+        if retrieval_request.federated:
+            (
+                result_chunks,
+                chunk_count,
+                timed_out_dataset_ids,
+                failed_dataset_ids,
+                queried_dataset_ids,
+            ) = await rag_service.retrieve_chunks_federated(
+                question=retrieval_request.question,
+                dataset_ids=retrieval_request.dataset_ids,
+                document_ids=retrieval_request.document_ids,
+                page=retrieval_request.page,
+                page_size=retrieval_request.page_size,
+                similarity_threshold=retrieval_request.similarity_threshold,
+                vector_similarity_weight=retrieval_request.vector_similarity_weight,
+                top_k=retrieval_request.top_k,
+                dataset_timeout=retrieval_request.dataset_timeout,
             )
-            for result_chunk in rag_service.retrieve_chunks(
+            is_fallback = (
+                not result_chunks
+                and bool(queried_dataset_ids)
+                and len(timed_out_dataset_ids) + len(failed_dataset_ids)
+                == len(queried_dataset_ids)
+            )
+        else:
+            result_chunks, chunk_count = await rag_service.retrieve_chunks(
                 question=retrieval_request.question,
                 dataset_ids=retrieval_request.dataset_ids,
                 document_ids=retrieval_request.document_ids,
@@ -191,10 +314,37 @@ async def retrieval(
                 vector_similarity_weight=retrieval_request.vector_similarity_weight,
                 top_k=retrieval_request.top_k,
             )
+    except (RAGFlowError, CircuitOpenError):
+        is_fallback = True
+
+    if is_fallback:
+        result_chunks, chunk_count = await knowledge_mirror.search(
+            question=retrieval_request.question,
+            dataset_ids=retrieval_request.dataset_ids,
+            document_ids=retrieval_request.document_ids,
+            page=retrieval_request.page,
+            page_size=retrieval_request.page_size,
+            top_k=retrieval_request.top_k,
+        )
+    return RetrievalResponse(
+        chunks=[
+            ResultChunk(
+                id=result_chunk.id,
+                content=result_chunk.content,
+                highlighted_content=result_chunk.highlighted_content,
+                similarity=result_chunk.similarity,
+                term_similarity=result_chunk.term_similarity,
+                vector_similarity=result_chunk.vector_similarity,
+            )
+            for result_chunk in result_chunks
         ],
+        chunk_count=chunk_count,
+        timed_out_dataset_ids=timed_out_dataset_ids,
+        failed_dataset_ids=failed_dataset_ids,
+        is_fallback=is_fallback,
         page=retrieval_request.page,
         page_count=rag_service.calculate_page_count(
-            total_items=retrieval_request.top_k,
+            total_items=chunk_count,
             page_size=retrieval_request.page_size,
         ),
         page_size=retrieval_request.page_size,
@@ -0,0 +1,17 @@
+from fastapi import APIRouter, Depends, HTTPException, Response, status
+
+from middlewares.auth import admin_only_middleware
+from services.metrics import PROMETHEUS_AVAILABLE, render_metrics
+
+router = APIRouter(prefix="/metrics", dependencies=[Depends(admin_only_middleware)])
+
+
+@router.get("", include_in_schema=False)
+async def get_metrics():
+    if not PROMETHEUS_AVAILABLE:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Metrics are not available",
+        )
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
@@ -1,13 +1,12 @@
 import os
 
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
-from sqlalchemy.orm import Session
 
 from api.ocr.models import OCRResponse
-from db.database import get_db
-from db.models import User, UserStatistics
-from middlewares.auth import auth_middleware
-from services.uni import ocr_service
+from middlewares.auth import CurrentUser, auth_middleware
+from services.circuit_breaker import CircuitOpenError
+from services.uni import ocr_service, usage_counter
+from services.usage_counter import UsageMetric
 
 ALLOWED_EXTENSIONS = {".jpg", ".jpeg", ".png"}
 
@@ -46,24 +45,19 @@ async def process_image_file(file: UploadFile) -> bytes:
 @router.post("/normal", response_model=OCRResponse)
 async def normal_ocr(
     file: UploadFile = File(...),
-    user: User = Depends(auth_middleware),
-    db: Session = Depends(get_db),
+    user: CurrentUser = Depends(auth_middleware),
 ):
     try:
         file_data = await process_image_file(file)
         result = ocr_service.normal_ocr(file_data)
 
-        user_stats = (
-            db.query(UserStatistics).filter(UserStatistics.user_id == user.id).first()
-        )
-        user_stats.ocr_recognition_count += 1
-        db.commit()
+        usage_counter.increment(user.id, UsageMetric.ocr_recognition)
 
         return OCRResponse(
             content=result.content,
             confidence=result.confidence,
         )
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception:
         raise HTTPException(
@@ -75,25 +69,19 @@ async def normal_ocr(
 @router.post("/turbo", response_model=OCRResponse)
 async def turbo_ocr(
     file: UploadFile = File(...),
-    user: User = Depends(auth_middleware),
-    db=Depends(get_db),
+    user: CurrentUser = Depends(auth_middleware),
 ):
     try:
         file_data = await process_image_file(file)
         result = ocr_service.turbo_ocr(file_data)
 
-        user_stats = (
-            db.query(UserStatistics).filter(UserStatistics.user_id == user.id).first()
-        )
-        if user_stats:
-            user_stats.ocr_recognition_count += 1
-        db.commit()
+        usage_counter.increment(user.id, UsageMetric.ocr_recognition)
 
         return OCRResponse(
             content=result.content,
             confidence=result.confidence,
         )
-    except HTTPException:
+    except (HTTPException, CircuitOpenError):
         raise
     except Exception:
         raise HTTPException(
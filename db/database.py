@@ -1,8 +1,15 @@
 import os
+import time
+from typing import Any, Dict
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import exc
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from db.replicas import Replica, ReplicaRouter
 
 load_dotenv()
 
@@ -10,15 +17,135 @@ DATABASE_URL = os.getenv("DATABASE_URL")
 if not DATABASE_URL:
     raise RuntimeError("DATABASE_URL environment variable not set")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+REPLICA_DATABASE_URLS = [
+    url.strip()
+    for url in os.getenv("REPLICA_DATABASE_URLS", "").split(",")
+    if url.strip()
+]
+REPLICA_POOL_SIZE = int(os.getenv("REPLICA_POOL_SIZE", str(DB_POOL_SIZE)))
+REPLICA_MAX_OVERFLOW = int(os.getenv("REPLICA_MAX_OVERFLOW", str(DB_MAX_OVERFLOW)))
+
+
+def to_async_url(url: str) -> URL:
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql":
+        return parsed.set(drivername="postgresql+asyncpg")
+    return parsed
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.checkout_time = 0.0
+        self.max_checkout_time = 0.0
+        self.timeouts = 0
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.checkouts += 1
+            self.checkout_time += elapsed
+            self.max_checkout_time = max(self.max_checkout_time, elapsed)
+
+    def statistics(self) -> Dict[str, Any]:
+        return {
+            "size": self.size(),
+            "checked_in": self.checkedin(),
+            "checked_out": self.checkedout(),
+            "overflow": max(0, self.overflow()),
+            "checkouts": self.checkouts,
+            "average_wait_ms": (
+                self.checkout_time / self.checkouts * 1000 if self.checkouts else 0.0
+            ),
+            "max_wait_ms": self.max_checkout_time * 1000,
+            "timeouts": self.timeouts,
+        }
+
+
+def create_pooled_engine(
+    url: URL, pool_size: int = DB_POOL_SIZE, max_overflow: int = DB_MAX_OVERFLOW
+) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        poolclass=TimedQueuePool,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args=(
+            {
+                "statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+                "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,
+            }
+            if url.get_driver_name() == "asyncpg"
+            else {}
+        ),
+    )
+
+
+def create_session_factory(bind: AsyncEngine) -> async_sessionmaker:
+    return async_sessionmaker(bind=bind, autoflush=False, expire_on_commit=False)
+
+
+ASYNC_DATABASE_URL = to_async_url(os.getenv("ASYNC_DATABASE_URL") or DATABASE_URL)
+async_engine = create_pooled_engine(ASYNC_DATABASE_URL)
+AsyncSessionLocal = create_session_factory(async_engine)
+
+
+def create_replica(url: str) -> Replica:
+    async_url = to_async_url(url)
+    replica_engine = create_pooled_engine(
+        async_url, pool_size=REPLICA_POOL_SIZE, max_overflow=REPLICA_MAX_OVERFLOW
+    )
+    return Replica(
+        name=async_url.render_as_string(hide_password=True),
+        engine=replica_engine,
+        session_factory=create_session_factory(replica_engine),
+    )
+
+
+replica_router = ReplicaRouter(
+    AsyncSessionLocal,
+    [create_replica(url) for url in REPLICA_DATABASE_URLS],
+    max_lag=float(os.getenv("REPLICA_MAX_LAG", "5")),
+    check_interval=float(os.getenv("REPLICA_CHECK_INTERVAL", "5")),
+    check_timeout=float(os.getenv("REPLICA_CHECK_TIMEOUT", "2")),
+    affinity_window=float(os.getenv("REPLICA_AFFINITY_WINDOW", "10")),
+)
+
+
+def pool_statistics() -> Dict[str, Dict[str, Any]]:
+    engines = {"primary": async_engine, **replica_router.engines()}
+    return {
+        name: engine.sync_engine.pool.statistics()
+        for name, engine in engines.items()
+        if isinstance(engine.sync_engine.pool, TimedQueuePool)
+    }
+
 
 Base = declarative_base()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+async def get_read_db():
+    async with replica_router.session_factory()() as db:
         yield db
-    finally:
-        db.close()
@@ -0,0 +1,303 @@
+import argparse
+import hashlib
+import sys
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Set, Tuple
+
+from sqlalchemy import MetaData, Table, create_engine, inspect, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.sql import operators, sqltypes
+from sqlalchemy.sql.elements import UnaryExpression
+
+from db.database import DATABASE_URL
+from db.models import Base
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+SCHEMA_FILE = Path(__file__).parent.parent / "sql" / "create_tables.sql"
+CHECK_SCHEMA = "schema_check"
+MIGRATION_LOCK_KEY = 0x6D696772
+
+IndexKey = Tuple[Tuple[str, ...], bool]
+
+
+@dataclass
+class Migration:
+    version: str
+    name: str
+    path: Path
+
+    @property
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+    @property
+    def checksum(self) -> str:
+        return hashlib.sha256(self.path.read_bytes()).hexdigest()
+
+
+@dataclass
+class TableShape:
+    columns: Dict[str, Tuple[str, bool]] = field(default_factory=dict)
+    primary_key: Tuple[str, ...] = ()
+    indexes: Set[IndexKey] = field(default_factory=set)
+
+
+def load_migrations() -> List[Migration]:
+    migrations = []
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        version, _, name = path.stem.partition("_")
+        migrations.append(Migration(version=version, name=name, path=path))
+    return migrations
+
+
+def ensure_migrations_table(connection: Connection):
+    connection.execute(
+        text(
+            """
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version VARCHAR(32) PRIMARY KEY,
+                name VARCHAR(255) NOT NULL,
+                checksum VARCHAR(64) NOT NULL,
+                applied_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+            """
+        )
+    )
+
+
+def applied_migrations(connection: Connection) -> Dict[str, str]:
+    rows = connection.execute(text("SELECT version, checksum FROM schema_migrations"))
+    return {version: checksum for version, checksum in rows}
+
+
+def upgrade(engine: Engine) -> List[Migration]:
+    applied: List[Migration] = []
+    with engine.connect() as connection:
+        connection.execute(
+            text("SELECT pg_advisory_lock(:key)"), {"key": MIGRATION_LOCK_KEY}
+        )
+        try:
+            ensure_migrations_table(connection)
+            connection.commit()
+            done = applied_migrations(connection)
+            for migration in load_migrations():
+                if migration.version in done:
+                    continue
+                try:
+                    connection.exec_driver_sql(migration.sql)
+                    connection.execute(
+                        text(
+                            "INSERT INTO schema_migrations (version, name, checksum) "
+                            "VALUES (:version, :name, :checksum)"
+                        ),
+                        {
+                            "version": migration.version,
+                            "name": migration.name,
+                            "checksum": migration.checksum,
+                        },
+                    )
+                    connection.commit()
+                except Exception:
+                    connection.rollback()
+                    raise
+                applied.append(migration)
+        finally:
+            connection.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": MIGRATION_LOCK_KEY}
+            )
+            connection.commit()
+    return applied
+
+
+def status(engine: Engine) -> List[Tuple[Migration, str]]:
+    with engine.connect() as connection:
+        ensure_migrations_table(connection)
+        connection.commit()
+        done = applied_migrations(connection)
+    result = []
+    for migration in load_migrations():
+        if migration.version not in done:
+            state = "pending"
+        elif done[migration.version] != migration.checksum:
+            state = "modified"
+        else:
+            state = "applied"
+        result.append((migration, state))
+    return result
+
+
+def _type_name(type_) -> str:
+    if isinstance(type_, sqltypes.Enum):
+        return f"ENUM({', '.join(sorted(type_.enums))})"
+    return type_.compile(dialect=postgresql.dialect())
+
+
+def _expression_name(expression) -> str:
+    if isinstance(expression, UnaryExpression):
+        name = _expression_name(expression.element)
+        return f"{name} DESC" if expression.modifier is operators.desc_op else name
+    return expression.name
+
+
+def table_from_metadata(table: Table) -> TableShape:
+    shape = TableShape(
+        columns={
+            column.name: (_type_name(column.type), column.nullable)
+            for column in table.columns
+        },
+        primary_key=tuple(column.name for column in table.primary_key.columns),
+    )
+    for column in table.columns:
+        if column.unique:
+            shape.indexes.add(((column.name,), True))
+    for index in table.indexes:
+        shape.indexes.add(
+            (
+                tuple(_expression_name(expression) for expression in index.expressions),
+                bool(index.unique),
+            )
+        )
+    return shape
+
+
+def schema_from_metadata(metadata: MetaData) -> Dict[str, TableShape]:
+    return {name: table_from_metadata(table) for name, table in metadata.tables.items()}
+
+
+def schema_from_database(connection: Connection, schema: str) -> Dict[str, TableShape]:
+    inspector = inspect(connection)
+    partitions = set(
+        connection.execute(
+            text(
+                "SELECT c.relname FROM pg_class c "
+                "JOIN pg_namespace n ON n.oid = c.relnamespace "
+                "WHERE c.relispartition AND n.nspname = :schema"
+            ),
+            {"schema": schema},
+        ).scalars()
+    )
+
+    result = {}
+    for table_name in inspector.get_table_names(schema=schema):
+        if table_name in partitions or table_name == "schema_migrations":
+            continue
+        shape = TableShape(
+            columns={
+                column["name"]: (_type_name(column["type"]), column["nullable"])
+                for column in inspector.get_columns(table_name, schema=schema)
+            },
+            primary_key=tuple(
+                inspector.get_pk_constraint(table_name, schema=schema)[
+                    "constrained_columns"
+                ]
+            ),
+        )
+        for constraint in inspector.get_unique_constraints(table_name, schema=schema):
+            shape.indexes.add((tuple(constraint["column_names"]), True))
+        for index in inspector.get_indexes(table_name, schema=schema):
+            if index.get("duplicates_constraint"):
+                continue
+            sorting = index.get("column_sorting", {})
+            shape.indexes.add(
+                (
+                    tuple(
+                        f"{name} DESC" if "desc" in sorting.get(name, ()) else name
+                        for name in index["column_names"]
+                    ),
+                    bool(index["unique"]),
+                )
+            )
+        result[table_name] = shape
+    return result
+
+
+def compare_schemas(
+    expected: Dict[str, TableShape], actual: Dict[str, TableShape]
+) -> List[str]:
+    differences = []
+    for table_name in sorted(expected.keys() - actual.keys()):
+        differences.append(f"missing table {table_name}")
+    for table_name in sorted(actual.keys() - expected.keys()):
+        differences.append(f"unexpected table {table_name}")
+
+    for table_name in sorted(expected.keys() & actual.keys()):
+        want, have = expected[table_name], actual[table_name]
+        for column in sorted(want.columns.keys() - have.columns.keys()):
+            differences.append(f"{table_name}: missing column {column}")
+        for column in sorted(have.columns.keys() - want.columns.keys()):
+            differences.append(f"{table_name}: unexpected column {column}")
+        for column in sorted(want.columns.keys() & have.columns.keys()):
+            if want.columns[column] != have.columns[column]:
+                differences.append(
+                    f"{table_name}.{column}: expected {want.columns[column]}, "
+                    f"found {have.columns[column]}"
+                )
+        if want.primary_key != have.primary_key:
+            differences.append(
+                f"{table_name}: expected primary key {want.primary_key}, "
+                f"found {have.primary_key}"
+            )
+        for columns, unique in sorted(want.indexes - have.indexes):
+            kind = "unique index" if unique else "index"
+            differences.append(f"{table_name}: missing {kind} on {columns}")
+        for columns, unique in sorted(have.indexes - want.indexes):
+            kind = "unique index" if unique else "index"
+            differences.append(f"{table_name}: unexpected {kind} on {columns}")
+    return differences
+
+
+def check(engine: Engine) -> Dict[str, List[str]]:
+    expected = schema_from_metadata(Base.metadata)
+    with engine.connect() as connection:
+        transaction = connection.begin()
+        try:
+            connection.exec_driver_sql(f"CREATE SCHEMA {CHECK_SCHEMA}")
+            connection.exec_driver_sql(f"SET LOCAL search_path TO {CHECK_SCHEMA}")
+            connection.exec_driver_sql(SCHEMA_FILE.read_text(encoding="utf-8"))
+            sql_schema = schema_from_database(connection, CHECK_SCHEMA)
+        finally:
+            transaction.rollback()
+        database_schema = schema_from_database(connection, "public")
+    return {
+        str(SCHEMA_FILE.relative_to(SCHEMA_FILE.parent.parent)): compare_schemas(
+            expected, sql_schema
+        ),
+        "database": compare_schemas(expected, database_schema),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Database schema migrations")
+    parser.add_argument("command", choices=["upgrade", "status", "check"])
+    args = parser.parse_args()
+    engine = create_engine(DATABASE_URL)
+
+    if args.command == "upgrade":
+        applied = upgrade(engine)
+        for migration in applied:
+            print(f"applied {migration.version} {migration.name}")
+        if not applied:
+            print("database is up to date")
+        return 0
+
+    if args.command == "status":
+        for migration, state in status(engine):
+            print(f"{migration.version} {migration.name}: {state}")
+        return 0
+
+    diverged = False
+    for source, differences in check(engine).items():
+        if differences:
+            diverged = True
+            print(f"models and {source} diverge:")
+            for difference in differences:
+                print(f"  {difference}")
+        else:
+            print(f"models match {source}")
+    return 1 if diverged else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
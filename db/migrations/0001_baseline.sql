@@ -0,0 +1,48 @@
+DO $$ BEGIN
+    CREATE TYPE user_type AS ENUM ('admin', 'user');
+EXCEPTION WHEN duplicate_object THEN NULL;
+END $$;
+
+CREATE TABLE IF NOT EXISTS users (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    email VARCHAR(255) NOT NULL UNIQUE,
+    nickname VARCHAR(255) NOT NULL,
+    password_hash VARCHAR(255) NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    type user_type NOT NULL DEFAULT 'user'
+);
+
+CREATE TABLE IF NOT EXISTS conversations (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    title VARCHAR(255) NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS user_statistics (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    conversation_count INTEGER NOT NULL DEFAULT 0,
+    ocr_recognition_count INTEGER NOT NULL DEFAULT 0,
+    knowledge_base_search_count INTEGER NOT NULL DEFAULT 0,
+    flow_chart_count INTEGER NOT NULL DEFAULT 0,
+    mind_map_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_conversations_user_id ON conversations(user_id);
+CREATE INDEX IF NOT EXISTS idx_user_statistics_user_id ON user_statistics(user_id);
+
+CREATE OR REPLACE FUNCTION update_updated_time() RETURNS TRIGGER AS $$ BEGIN NEW.updated_at = CURRENT_TIMESTAMP;
+RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trigger_update_users_updated_time ON users;
+CREATE TRIGGER trigger_update_users_updated_time BEFORE
+UPDATE ON users FOR EACH ROW EXECUTE FUNCTION update_updated_time();
+
+DROP TRIGGER IF EXISTS trigger_update_conversations_updated_time ON conversations;
+CREATE TRIGGER trigger_update_conversations_updated_time BEFORE
+UPDATE ON conversations FOR EACH ROW EXECUTE FUNCTION update_updated_time();
@@ -0,0 +1,28 @@
+CREATE TABLE IF NOT EXISTS usage_events (
+    id BIGSERIAL,
+    occurred_at TIMESTAMPTZ NOT NULL,
+    user_id UUID NOT NULL,
+    metric VARCHAR(64) NOT NULL,
+    PRIMARY KEY (id, occurred_at)
+) PARTITION BY RANGE (occurred_at);
+
+CREATE TABLE IF NOT EXISTS usage_hourly_rollups (
+    bucket TIMESTAMPTZ NOT NULL,
+    user_id UUID NOT NULL,
+    metric VARCHAR(64) NOT NULL,
+    count BIGINT NOT NULL,
+    PRIMARY KEY (bucket, user_id, metric)
+);
+
+CREATE TABLE IF NOT EXISTS usage_daily_rollups (
+    bucket DATE NOT NULL,
+    user_id UUID NOT NULL,
+    metric VARCHAR(64) NOT NULL,
+    count BIGINT NOT NULL,
+    PRIMARY KEY (bucket, user_id, metric)
+);
+
+CREATE TABLE IF NOT EXISTS usage_rollup_watermarks (
+    name VARCHAR(64) PRIMARY KEY,
+    refreshed_until TIMESTAMPTZ NOT NULL
+);
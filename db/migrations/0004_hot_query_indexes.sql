@@ -0,0 +1,36 @@
+CREATE INDEX IF NOT EXISTS idx_conversations_user_id_updated_at
+    ON conversations (user_id, updated_at DESC);
+
+UPDATE user_statistics s
+SET conversation_count = t.conversation_count,
+    ocr_recognition_count = t.ocr_recognition_count,
+    knowledge_base_search_count = t.knowledge_base_search_count,
+    flow_chart_count = t.flow_chart_count,
+    mind_map_count = t.mind_map_count
+FROM (
+    SELECT
+        min(id::text)::uuid AS id,
+        sum(conversation_count) AS conversation_count,
+        sum(ocr_recognition_count) AS ocr_recognition_count,
+        sum(knowledge_base_search_count) AS knowledge_base_search_count,
+        sum(flow_chart_count) AS flow_chart_count,
+        sum(mind_map_count) AS mind_map_count
+    FROM user_statistics
+    GROUP BY user_id
+    HAVING count(*) > 1
+) t
+WHERE s.id = t.id;
+
+DELETE FROM user_statistics s
+USING user_statistics k
+WHERE s.user_id = k.user_id AND s.id::text > k.id::text;
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_user_statistics_user_id
+    ON user_statistics (user_id);
+
+DROP INDEX IF EXISTS ix_users_id;
+DROP INDEX IF EXISTS ix_conversations_id;
+DROP INDEX IF EXISTS ix_conversations_user_id;
+DROP INDEX IF EXISTS ix_user_statistics_user_id;
+DROP INDEX IF EXISTS idx_conversations_user_id;
+DROP INDEX IF EXISTS idx_user_statistics_user_id;
@@ -0,0 +1,2 @@
+CREATE INDEX IF NOT EXISTS idx_usage_events_occurred_at
+    ON usage_events USING brin (occurred_at);
@@ -3,7 +3,17 @@ import enum
 import uuid
 from typing import List
 
-from sqlalchemy import UUID, DateTime, Enum, ForeignKey, Integer, String
+from sqlalchemy import (
+    UUID,
+    BigInteger,
+    Date,
+    DateTime,
+    Enum,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+)
 from sqlalchemy.orm import Mapped, declarative_base, mapped_column, relationship
 from sqlalchemy.sql import func
 
@@ -19,7 +29,7 @@ class User(Base):
     __tablename__ = "users"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
     email: Mapped[str] = mapped_column(String(255), unique=True, nullable=False)
     nickname: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -31,8 +41,9 @@ class User(Base):
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
     type: Mapped[UserType] = mapped_column(
-        Enum(UserType), default=UserType.user, nullable=False
+        Enum(UserType, name="user_type"), default=UserType.user, nullable=False
     )
+    token_version: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
 
     statistics: Mapped["UserStatistics"] = relationship(
         "UserStatistics", back_populates="user", uselist=False
@@ -43,13 +54,12 @@ class Conversation(Base):
     __tablename__ = "conversations"
 
     id: Mapped[uuid.UUID] = mapped_column(
-        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True
+        UUID(as_uuid=True), primary_key=True, default=uuid.uuid4
     )
     user_id: Mapped[uuid.UUID] = mapped_column(
         UUID(as_uuid=True),
         ForeignKey("users.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     created_at: Mapped[datetime.datetime] = mapped_column(
@@ -60,6 +70,13 @@ class Conversation(Base):
     )
 
 
+Index(
+    "idx_conversations_user_id_updated_at",
+    Conversation.user_id,
+    Conversation.updated_at.desc(),
+)
+
+
 class UserStatistics(Base):
     __tablename__ = "user_statistics"
 
@@ -70,7 +87,6 @@ class UserStatistics(Base):
         UUID(as_uuid=True),
         ForeignKey("users.id", ondelete="CASCADE"),
         nullable=False,
-        index=True,
     )
     conversation_count: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
     ocr_recognition_count: Mapped[int] = mapped_column(
@@ -87,3 +103,54 @@ class UserStatistics(Base):
     )
 
     user: Mapped["User"] = relationship("User", back_populates="statistics")
+
+
+Index("uq_user_statistics_user_id", UserStatistics.user_id, unique=True)
+
+
+class UsageEvent(Base):
+    __tablename__ = "usage_events"
+    __table_args__ = {"postgresql_partition_by": "RANGE (occurred_at)"}
+
+    id: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=True)
+    occurred_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    metric: Mapped[str] = mapped_column(String(64), nullable=False)
+
+
+Index(
+    "idx_usage_events_occurred_at",
+    UsageEvent.occurred_at,
+    postgresql_using="brin",
+)
+
+
+class UsageHourlyRollup(Base):
+    __tablename__ = "usage_hourly_rollups"
+
+    bucket: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), primary_key=True
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    metric: Mapped[str] = mapped_column(String(64), primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class UsageDailyRollup(Base):
+    __tablename__ = "usage_daily_rollups"
+
+    bucket: Mapped[datetime.date] = mapped_column(Date, primary_key=True)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True)
+    metric: Mapped[str] = mapped_column(String(64), primary_key=True)
+    count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class UsageRollupWatermark(Base):
+    __tablename__ = "usage_rollup_watermarks"
+
+    name: Mapped[str] = mapped_column(String(64), primary_key=True)
+    refreshed_until: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False
+    )
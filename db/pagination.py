@@ -0,0 +1,23 @@
+import base64
+import json
+from typing import Any, List
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def encode_cursor(values: List[Any]) -> str:
+    payload = json.dumps(values, default=str, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+    except ValueError:
+        raise InvalidCursorError("Invalid cursor")
+    if not isinstance(values, list):
+        raise InvalidCursorError("Invalid cursor")
+    return values
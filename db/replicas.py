@@ -0,0 +1,128 @@
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Hashable, List, Optional
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker
+
+from services.cache import LRUCache
+
+REPLICA_LAG_SQL = text(
+    """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+    """
+)
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: AsyncEngine
+    session_factory: async_sessionmaker
+    healthy: bool = False
+    lag: Optional[float] = None
+    error: Optional[str] = None
+    checked_at: Optional[float] = None
+
+
+class ReplicaRouter:
+    def __init__(
+        self,
+        primary: async_sessionmaker,
+        replicas: List[Replica],
+        max_lag: float = 5,
+        check_interval: float = 5,
+        check_timeout: float = 2,
+        affinity_window: float = 10,
+        affinity_entries: int = 100000,
+    ):
+        self._primary = primary
+        self._replicas = replicas
+        self._max_lag = max_lag
+        self._check_interval = check_interval
+        self._check_timeout = check_timeout
+        self._affinity: LRUCache[bool] = LRUCache(
+            max_entries=affinity_entries, ttl=affinity_window
+        )
+        self._counter = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._replicas and self._check_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self._replicas:
+            await replica.engine.dispose()
+
+    async def _run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self._check_interval)
+
+    async def _probe(self, replica: Replica) -> float:
+        async with replica.engine.connect() as connection:
+            lag = await connection.scalar(REPLICA_LAG_SQL)
+        return float(lag or 0)
+
+    async def _check(self, replica: Replica):
+        try:
+            replica.lag = await asyncio.wait_for(
+                self._probe(replica), timeout=self._check_timeout
+            )
+            replica.error = None
+            replica.healthy = replica.lag <= self._max_lag
+        except Exception as e:
+            replica.error = str(e) or type(e).__name__
+            if replica.healthy:
+                print(
+                    f"Replica {replica.name} check failed: {replica.error}", flush=True
+                )
+            replica.healthy = False
+        replica.checked_at = time.time()
+
+    async def check(self):
+        await asyncio.gather(*(self._check(replica) for replica in self._replicas))
+
+    def pin(self, key: Hashable):
+        self._affinity.put(key, True)
+
+    def session_factory(
+        self, key: Optional[Hashable] = None, primary: bool = False
+    ) -> async_sessionmaker:
+        if primary or (key is not None and self._affinity.get(key)):
+            return self._primary
+        healthy = [replica for replica in self._replicas if replica.healthy]
+        if not healthy:
+            return self._primary
+        return healthy[next(self._counter) % len(healthy)].session_factory
+
+    def engines(self) -> Dict[str, AsyncEngine]:
+        return {replica.name: replica.engine for replica in self._replicas}
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [
+            {
+                "name": replica.name,
+                "healthy": replica.healthy,
+                "lag": replica.lag,
+                "error": replica.error,
+                "checked_at": replica.checked_at,
+            }
+            for replica in self._replicas
+        ]
@@ -1,9 +1,12 @@
+import math
 import os
+from contextlib import asynccontextmanager
 
 import uvicorn
 from dotenv import load_dotenv
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
@@ -12,7 +15,27 @@ import api.auth.router
 import api.conversations.router
 import api.diagrams.router
 import api.knowledge.router
+import api.metrics.router
 import api.ocr.router
+from db.database import async_engine, replica_router
+from middlewares.metrics import MetricsMiddleware
+from middlewares.tracing import TracingMiddleware
+from services.circuit_breaker import CircuitOpenError
+from services.metrics import mark_process_dead
+from services.tracing import tracer
+from services.uni import (
+    event_loop_lag_monitor,
+    graph_service,
+    health_monitor,
+    ingestion_monitor,
+    knowledge_mirror,
+    login_throttle,
+    loop_watchdog,
+    password_service,
+    rag_service,
+    usage_counter,
+    usage_event_log,
+)
 
 load_dotenv()
 
@@ -41,8 +64,47 @@ def verify_credentials(credentials: HTTPBasicCredentials = Depends(security)):
     return True
 
 
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))},
+    )
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    graph_service.start()
+    knowledge_mirror.start()
+    usage_counter.start()
+    usage_event_log.start()
+    replica_router.start()
+    health_monitor.start()
+    event_loop_lag_monitor.start()
+    tracer.start()
+    loop_watchdog.start()
+    password_service.start()
+    yield
+    await loop_watchdog.aclose()
+    await tracer.aclose()
+    await event_loop_lag_monitor.aclose()
+    await health_monitor.aclose()
+    await ingestion_monitor.aclose()
+    await knowledge_mirror.aclose()
+    await graph_service.aclose()
+    await rag_service.aclose()
+    await login_throttle.aclose()
+    password_service.shutdown()
+    await usage_counter.aclose()
+    await usage_event_log.aclose()
+    await replica_router.aclose()
+    await async_engine.dispose()
+    mark_process_dead()
+
+
 def create_app() -> FastAPI:
     app = FastAPI(
+        lifespan=lifespan,
         docs_url="/docs" if os.getenv("ENV") == "dev" else None,
         redoc_url=None,
         openapi_url="/openapi.json" if os.getenv("ENV") == "dev" else None,
@@ -73,6 +135,9 @@ def create_app() -> FastAPI:
         allow_headers=["*"],
     )
     app.add_middleware(ProxyHeadersMiddleware, trusted_hosts="*")
+    app.add_middleware(TracingMiddleware, tracer=tracer)
+    app.add_middleware(MetricsMiddleware)
+    app.add_exception_handler(CircuitOpenError, circuit_open_handler)
 
     app.include_router(api.auth.router.router)
     app.include_router(api.ocr.router.router)
@@ -80,6 +145,7 @@ def create_app() -> FastAPI:
     app.include_router(api.conversations.router.router)
     app.include_router(api.diagrams.router.router)
     app.include_router(api.admin.router.router)
+    app.include_router(api.metrics.router.router)
 
     return app
 
@@ -1,13 +1,19 @@
+import datetime
 import os
 import uuid
+from dataclasses import dataclass
+from typing import Any, Dict
 
 import jwt
 from dotenv import load_dotenv
 from fastapi import Depends, Header, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from db.database import get_db
+from db.database import get_async_db, replica_router
 from db.models import User, UserType
+from services.cache import LRUCache
+from services.uni import usage_counter
 
 load_dotenv()
 
@@ -16,10 +22,40 @@ if not JWT_SECRET:
     raise RuntimeError("JWT_SECRET environment variable not set")
 
 
-async def auth_middleware(
-    authorization: str = Header(None),
-    db: Session = Depends(get_db),
-) -> User:
+@dataclass(frozen=True)
+class CurrentUser:
+    id: uuid.UUID
+    email: str
+    nickname: str
+    type: UserType
+    token_version: int
+    created_at: datetime.datetime
+    updated_at: datetime.datetime
+
+    @classmethod
+    def from_user(cls, user: User) -> "CurrentUser":
+        return cls(
+            id=user.id,
+            email=user.email,
+            nickname=user.nickname,
+            type=user.type,
+            token_version=user.token_version,
+            created_at=user.created_at,
+            updated_at=user.updated_at,
+        )
+
+
+user_cache: LRUCache[CurrentUser] = LRUCache(
+    max_entries=int(os.getenv("AUTH_USER_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("AUTH_USER_CACHE_TTL", "60")),
+)
+
+
+def invalidate_user(user_id: uuid.UUID):
+    user_cache.invalidate(user_id)
+
+
+async def token_claims(authorization: str = Header(None)) -> Dict[str, Any]:
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -29,30 +65,6 @@ async def auth_middleware(
     token = authorization.split(" ")[1]
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
-        user_id = payload.get("sub")
-
-        if not user_id:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token",
-            )
-
-        try:
-            uuid_obj = uuid.UUID(user_id)
-        except ValueError:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token",
-            )
-
-        user = db.query(User).filter(User.id == uuid_obj).first()
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found",
-            )
-
-        return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -63,6 +75,30 @@ async def auth_middleware(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
         )
+
+    try:
+        payload["sub"] = uuid.UUID(payload.get("sub") or "")
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid token",
+        )
+    return payload
+
+
+async def resolve_user(claims: Dict[str, Any], db: AsyncSession) -> CurrentUser:
+    user_id = claims["sub"]
+    try:
+        user = user_cache.get(user_id)
+        if user is None:
+            db_user = await db.scalar(select(User).where(User.id == user_id))
+            if not db_user:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED,
+                    detail="User not found",
+                )
+            user = CurrentUser.from_user(db_user)
+            user_cache.put(user_id, user)
     except HTTPException:
         raise
     except Exception:
@@ -71,13 +107,46 @@ async def auth_middleware(
             detail="Internal server error",
         )
 
+    if claims.get("ver", 0) != user.token_version:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Token has been revoked",
+        )
+    return user
+
+
+async def auth_middleware(
+    claims: Dict[str, Any] = Depends(token_claims),
+    db: AsyncSession = Depends(get_async_db),
+) -> CurrentUser:
+    return await resolve_user(claims, db)
+
 
 async def admin_only_middleware(
-    user: User = Depends(auth_middleware),
-):
+    claims: Dict[str, Any] = Depends(token_claims),
+    db: AsyncSession = Depends(get_async_db),
+) -> CurrentUser:
+    if claims.get("role", UserType.admin.value) != UserType.admin.value:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required",
+        )
+    user = await resolve_user(claims, db)
     if user.type != UserType.admin:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Admin access required",
         )
     return user
+
+
+async def get_user_read_db(user: CurrentUser = Depends(auth_middleware)):
+    # The affinity pin lives in this worker's memory and only covers flushes
+    # it ran, so reads also go to the primary while this worker still holds
+    # uncommitted counters for the user. Flushes by other workers show up once
+    # the replica catches up, and only replicas within REPLICA_MAX_LAG serve.
+    session_factory = replica_router.session_factory(
+        user.id, primary=usage_counter.has_pending(user.id)
+    )
+    async with session_factory() as db:
+        yield db
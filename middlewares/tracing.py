@@ -0,0 +1,46 @@
+from typing import Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from middlewares.metrics import route_template
+from services.tracing import Tracer
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp, tracer: Tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self.tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        handle = self.tracer.start_trace(
+            f"{method} {scope['path']}",
+            traceparent=Headers(scope=scope).get("traceparent"),
+            method=method,
+            path=scope["path"],
+        )
+        trace = handle[0]
+        status: Optional[int] = None
+
+        async def send_wrapper(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message)["X-Trace-Id"] = trace.trace_id
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = route_template(scope)
+            trace.root.attributes["route"] = route
+            self.tracer.finish_trace(
+                handle,
+                status=status if status is not None else 500,
+                name=f"{method} {route}",
+            )
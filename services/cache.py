@@ -0,0 +1,75 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Optional, Tuple, TypeVar
+
+V = TypeVar("V")
+
+
+class LRUCache(Generic[V]):
+    def __init__(
+        self,
+        max_entries: int,
+        max_weight: Optional[int] = None,
+        ttl: Optional[float] = None,
+        weigher: Callable[[V], int] = lambda _: 1,
+    ):
+        self._max_entries = max_entries
+        self._max_weight = max_weight
+        self._ttl = ttl
+        self._weigher = weigher
+        self._entries: "OrderedDict[Hashable, Tuple[V, int, float]]" = OrderedDict()
+        self._weight = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def weight(self) -> int:
+        return self._weight
+
+    def get(self, key: Hashable) -> Optional[V]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, _, expires_at = entry
+            if expires_at and expires_at <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key: Hashable, value: V):
+        weight = self._weigher(value)
+        if self._max_weight is not None and weight > self._max_weight:
+            return
+        expires_at = time.monotonic() + self._ttl if self._ttl else 0.0
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, weight, expires_at)
+            self._weight += weight
+            self._evict()
+
+    def invalidate(self, key: Hashable):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def _remove(self, key: Hashable):
+        _, weight, _ = self._entries.pop(key)
+        self._weight -= weight
+
+    def _evict(self):
+        while len(self._entries) > self._max_entries or (
+            self._max_weight is not None and self._weight > self._max_weight
+        ):
+            key = next(iter(self._entries))
+            self._remove(key)
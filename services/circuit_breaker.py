@@ -0,0 +1,193 @@
+import os
+import threading
+import time
+from collections import deque
+from enum import Enum
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class CircuitState(str, Enum):
+    closed = "closed"
+    open = "open"
+    half_open = "half_open"
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is temporarily unavailable")
+        self.name = name
+        self.retry_after = retry_after
+
+
+def is_failure(error: BaseException) -> bool:
+    if getattr(error, "client_error", False):
+        return False
+    status_code = getattr(error, "status_code", None)
+    if isinstance(status_code, int) and 400 <= status_code < 500:
+        return status_code in (408, 429)
+    return True
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window: float = 60,
+        min_calls: int = 10,
+        failure_rate: float = 0.5,
+        slow_call_duration: float = 10,
+        slow_call_rate: float = 0.8,
+        open_duration: float = 30,
+        half_open_calls: int = 3,
+    ):
+        self.name = name
+        self._window = window
+        self._min_calls = min_calls
+        self._failure_rate = failure_rate
+        self._slow_call_duration = slow_call_duration
+        self._slow_call_rate = slow_call_rate
+        self._open_duration = open_duration
+        self._half_open_calls = half_open_calls
+        self._outcomes: Deque[Tuple[float, bool, bool]] = deque()
+        self._lock = threading.Lock()
+        self._state = CircuitState.closed
+        self._opened_at: Optional[float] = None
+        self._open_until = 0.0
+        self._probes = 0
+        self._probe_successes = 0
+        self._rejected = 0
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._state
+
+    def _open(self, now: float, reason: str):
+        self._state = CircuitState.open
+        self._opened_at = time.time()
+        self._open_until = now + self._open_duration
+        self._outcomes.clear()
+        print(f"Circuit {self.name} opened: {reason}", flush=True)
+
+    def _prune(self, now: float):
+        while self._outcomes and self._outcomes[0][0] < now - self._window:
+            self._outcomes.popleft()
+
+    def _rates(self) -> Tuple[float, float]:
+        if not self._outcomes:
+            return 0.0, 0.0
+        failed = sum(1 for _, failure, _ in self._outcomes if failure)
+        slow = sum(1 for _, _, is_slow in self._outcomes if is_slow)
+        return failed / len(self._outcomes), slow / len(self._outcomes)
+
+    def check(self):
+        now = time.monotonic()
+        with self._lock:
+            if self._state == CircuitState.open and now < self._open_until:
+                self._rejected += 1
+                raise CircuitOpenError(self.name, self._open_until - now)
+
+    def acquire(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if self._state == CircuitState.open:
+                if now < self._open_until:
+                    self._rejected += 1
+                    raise CircuitOpenError(self.name, self._open_until - now)
+                self._state = CircuitState.half_open
+                self._probes = 0
+                self._probe_successes = 0
+            if self._state == CircuitState.half_open:
+                if self._probes >= self._half_open_calls:
+                    self._rejected += 1
+                    raise CircuitOpenError(self.name, 1)
+                self._probes += 1
+                return True
+            return False
+
+    def release(self, probe: bool):
+        if not probe:
+            return
+        with self._lock:
+            if self._state == CircuitState.half_open:
+                self._probes -= 1
+
+    def record(self, duration: float, failed: bool, probe: bool):
+        now = time.monotonic()
+        slow = duration >= self._slow_call_duration
+        with self._lock:
+            if probe:
+                if self._state != CircuitState.half_open:
+                    return
+                if failed or slow:
+                    self._open(now, "probe failed" if failed else "probe was slow")
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self._half_open_calls:
+                    self._state = CircuitState.closed
+                    self._opened_at = None
+                    print(f"Circuit {self.name} closed", flush=True)
+                return
+            if self._state != CircuitState.closed:
+                return
+            self._prune(now)
+            self._outcomes.append((now, failed, slow))
+            if len(self._outcomes) < self._min_calls:
+                return
+            failure_rate, slow_call_rate = self._rates()
+            if failure_rate >= self._failure_rate:
+                self._open(now, f"{failure_rate:.0%} of calls failed")
+            elif slow_call_rate >= self._slow_call_rate:
+                self._open(now, f"{slow_call_rate:.0%} of calls were slow")
+
+    def snapshot(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            failure_rate, slow_call_rate = self._rates()
+            return {
+                "state": self._state.value,
+                "calls": len(self._outcomes),
+                "failure_rate": failure_rate,
+                "slow_call_rate": slow_call_rate,
+                "rejected": self._rejected,
+                "opened_at": self._opened_at,
+                "retry_after": (
+                    max(0.0, self._open_until - now)
+                    if self._state == CircuitState.open
+                    else None
+                ),
+            }
+
+
+def _circuit_breaker(name: str, env_prefix: str, slow_call_duration: float):
+    return CircuitBreaker(
+        name,
+        window=float(os.getenv("CIRCUIT_BREAKER_WINDOW", "60")),
+        min_calls=int(os.getenv("CIRCUIT_BREAKER_MIN_CALLS", "10")),
+        failure_rate=float(os.getenv("CIRCUIT_BREAKER_FAILURE_RATE", "0.5")),
+        slow_call_duration=float(
+            os.getenv(f"{env_prefix}_SLOW_CALL_SECONDS", str(slow_call_duration))
+        ),
+        slow_call_rate=float(os.getenv("CIRCUIT_BREAKER_SLOW_CALL_RATE", "0.8")),
+        open_duration=float(os.getenv("CIRCUIT_BREAKER_OPEN_SECONDS", "30")),
+        half_open_calls=int(os.getenv("CIRCUIT_BREAKER_HALF_OPEN_CALLS", "3")),
+    )
+
+
+circuit_breakers: Dict[str, CircuitBreaker] = (
+    {
+        "ragflow": _circuit_breaker("ragflow", "RAG", 10),
+        "llm": _circuit_breaker("llm", "LLM", 60),
+        "ocr": _circuit_breaker("ocr", "OCR", 20),
+        "lightrag": _circuit_breaker("lightrag", "LIGHT_GRAPH", 15),
+    }
+    if os.getenv("CIRCUIT_BREAKER_ENABLED", "true").lower() == "true"
+    else {}
+)
+
+
+def check_circuit(name: str):
+    breaker = circuit_breakers.get(name)
+    if breaker is not None:
+        breaker.check()
@@ -0,0 +1,138 @@
+import hashlib
+import json
+from array import array
+from bisect import bisect_left
+from collections import deque
+from typing import Any, Dict, List
+
+
+class GraphIndex:
+    def __init__(
+        self,
+        nodes: List[Dict[str, Any]],
+        edges: List[Dict[str, Any]],
+        labels: List[str],
+        version: str,
+        is_complete: bool,
+    ):
+        self.version = version
+        self.is_complete = is_complete
+        self._nodes = tuple(nodes)
+        self._position = {node["id"]: i for i, node in enumerate(nodes)}
+
+        node_count = len(nodes)
+        sources = array("l")
+        targets = array("l")
+        kept_edges = []
+        for edge in edges:
+            source = self._position.get(edge["source"])
+            target = self._position.get(edge["target"])
+            if source is None or target is None:
+                continue
+            sources.append(source)
+            targets.append(target)
+            kept_edges.append(edge)
+        self._edges = tuple(kept_edges)
+
+        degrees = array("l", [0]) * node_count
+        for source, target in zip(sources, targets):
+            degrees[source] += 1
+            degrees[target] += 1
+
+        self._offsets = array("l", [0]) * (node_count + 1)
+        for i in range(node_count):
+            self._offsets[i + 1] = self._offsets[i] + degrees[i]
+
+        adjacency_size = self._offsets[node_count]
+        self._neighbors = array("l", [0]) * adjacency_size
+        self._edge_refs = array("l", [0]) * adjacency_size
+        cursor = array("l", self._offsets[:node_count])
+        for edge_ref, (source, target) in enumerate(zip(sources, targets)):
+            for node, other in ((source, target), (target, source)):
+                slot = cursor[node]
+                self._neighbors[slot] = other
+                self._edge_refs[slot] = edge_ref
+                cursor[node] += 1
+
+        self._by_degree = array(
+            "l", sorted(range(node_count), key=lambda i: degrees[i], reverse=True)
+        )
+
+        unique_labels = sorted(set(labels) | set(self._position))
+        self._labels = tuple(unique_labels)
+        order = sorted(
+            range(len(unique_labels)), key=lambda i: unique_labels[i].casefold()
+        )
+        self._label_keys = [unique_labels[i].casefold() for i in order]
+        self._labels_by_key = tuple(unique_labels[i] for i in order)
+
+    @classmethod
+    def from_export(cls, export: bytes, labels: bytes) -> "GraphIndex":
+        data = json.loads(export)
+        return cls(
+            nodes=data.get("nodes", []),
+            edges=data.get("edges", []),
+            labels=json.loads(labels),
+            version=hashlib.blake2b(export, digest_size=8).hexdigest(),
+            is_complete=not data.get("is_truncated", False),
+        )
+
+    @property
+    def labels(self) -> List[str]:
+        return list(self._labels)
+
+    def can_serve(self, label: str) -> bool:
+        return label == "*" or self.is_complete
+
+    def search_labels(self, prefix: str, limit: int) -> List[str]:
+        key = prefix.casefold()
+        start = bisect_left(self._label_keys, key)
+        result = []
+        for i in range(start, len(self._label_keys)):
+            if len(result) >= limit or not self._label_keys[i].startswith(key):
+                break
+            result.append(self._labels_by_key[i])
+        return result
+
+    def subgraph(self, label: str, max_depth: int, max_nodes: int) -> Dict[str, Any]:
+        if label == "*":
+            selected = list(self._by_degree[:max_nodes])
+            is_truncated = len(self._nodes) > max_nodes or not self.is_complete
+        else:
+            start = self._position.get(label)
+            if start is None:
+                return {"nodes": [], "edges": [], "is_truncated": False}
+            selected, is_truncated = self._bfs(start, max_depth, max_nodes)
+            is_truncated = is_truncated or not self.is_complete
+
+        members = set(selected)
+        edge_refs = set()
+        for node in selected:
+            for slot in range(self._offsets[node], self._offsets[node + 1]):
+                if self._neighbors[slot] in members:
+                    edge_refs.add(self._edge_refs[slot])
+
+        return {
+            "nodes": [self._nodes[i] for i in selected],
+            "edges": [self._edges[i] for i in sorted(edge_refs)],
+            "is_truncated": is_truncated,
+        }
+
+    def _bfs(self, start: int, max_depth: int, max_nodes: int):
+        visited = {start}
+        order = [start]
+        queue = deque([(start, 0)])
+        while queue:
+            node, depth = queue.popleft()
+            if depth >= max_depth:
+                continue
+            for slot in range(self._offsets[node], self._offsets[node + 1]):
+                neighbor = self._neighbors[slot]
+                if neighbor in visited:
+                    continue
+                if len(order) >= max_nodes:
+                    return order, True
+                visited.add(neighbor)
+                order.append(neighbor)
+                queue.append((neighbor, depth + 1))
+        return order, False
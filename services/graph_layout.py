@@ -0,0 +1,78 @@
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+
+def force_layout(
+    node_count: int,
+    sources: np.ndarray,
+    targets: np.ndarray,
+    iterations: int = 60,
+    seed: int = 0,
+) -> np.ndarray:
+    if node_count == 0:
+        return np.zeros((0, 2), dtype=np.float32)
+    if node_count == 1:
+        return np.zeros((1, 2), dtype=np.float32)
+
+    rng = np.random.default_rng(seed)
+    positions = rng.random((node_count, 2), dtype=np.float32) - 0.5
+    k = np.float32(np.sqrt(1.0 / node_count))
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+
+    x = positions[:, 0]
+    y = positions[:, 1]
+    for _ in range(iterations):
+        dx = x[:, None] - x[None, :]
+        dy = y[:, None] - y[None, :]
+        repulsion = dx * dx
+        repulsion += dy * dy
+        np.maximum(repulsion, 1e-4, out=repulsion)
+        np.divide(k * k, repulsion, out=repulsion)
+        displacement = np.empty_like(positions)
+        displacement[:, 0] = np.einsum("ij,ij->i", dx, repulsion)
+        displacement[:, 1] = np.einsum("ij,ij->i", dy, repulsion)
+
+        if len(sources):
+            edge_delta = positions[sources] - positions[targets]
+            edge_distance = np.sqrt(np.einsum("ij,ij->i", edge_delta, edge_delta))
+            pull = edge_delta * (edge_distance / k)[:, None]
+            np.subtract.at(displacement, sources, pull)
+            np.add.at(displacement, targets, pull)
+
+        length = np.sqrt(np.einsum("ij,ij->i", displacement, displacement))
+        np.maximum(length, 0.01, out=length)
+        positions += displacement * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+
+    positions -= positions.mean(axis=0)
+    scale = np.abs(positions).max()
+    if scale > 0:
+        positions /= scale
+    return positions
+
+
+def apply_layout(
+    graph: Dict[str, Any], iterations: int = 60, max_nodes: Optional[int] = None
+) -> Dict[str, Any]:
+    nodes = graph.get("nodes", [])
+    if max_nodes is not None and len(nodes) > max_nodes:
+        return graph
+    position = {node["id"]: i for i, node in enumerate(nodes)}
+    pairs = [
+        (position[edge["source"]], position[edge["target"]])
+        for edge in graph.get("edges", [])
+        if edge["source"] in position and edge["target"] in position
+    ]
+    edge_array = np.array(pairs, dtype=np.intp).reshape(-1, 2)
+    coordinates = force_layout(
+        len(nodes), edge_array[:, 0], edge_array[:, 1], iterations=iterations
+    )
+    return {
+        **graph,
+        "nodes": [
+            {**node, "x": round(float(x), 4), "y": round(float(y), 4)}
+            for node, (x, y) in zip(nodes, coordinates.tolist())
+        ],
+    }
@@ -0,0 +1,258 @@
+import asyncio
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import httpx
+
+from services.cache import LRUCache
+from services.graph_index import GraphIndex
+from services.graph_layout import apply_layout
+from services.metrics import UpstreamCall
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_SIZE = 1024
+
+
+class GraphServiceError(Exception):
+    pass
+
+
+@dataclass
+class GraphPayload:
+    body: bytes
+    etag: str
+    gzip_body: Optional[bytes] = None
+    brotli_body: Optional[bytes] = None
+
+    @classmethod
+    def from_bytes(cls, body: bytes) -> "GraphPayload":
+        etag = f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"'
+        if len(body) < COMPRESSION_MIN_SIZE:
+            return cls(body=body, etag=etag)
+        return cls(
+            body=body,
+            etag=etag,
+            gzip_body=gzip.compress(body, compresslevel=6),
+            brotli_body=brotli.compress(body, quality=5) if brotli else None,
+        )
+
+    @classmethod
+    def from_data(cls, data: Any) -> "GraphPayload":
+        return cls.from_bytes(
+            json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode()
+        )
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or self.etag in tags or f"W/{self.etag}" in tags
+
+    def encode(self, accept_encoding: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        accepted = set()
+        for item in (accept_encoding or "").split(","):
+            coding, _, params = item.strip().partition(";")
+            if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00"):
+                continue
+            accepted.add(coding.strip().lower())
+        if self.brotli_body is not None and "br" in accepted:
+            return self.brotli_body, "br"
+        if self.gzip_body is not None and "gzip" in accepted:
+            return self.gzip_body, "gzip"
+        return self.body, None
+
+
+class GraphService:
+    def __init__(
+        self,
+        endpoint: str,
+        cache_ttl: float = 60,
+        cache_entries: int = 128,
+        max_connections: int = 20,
+        timeout: float = 30,
+        index_refresh_interval: float = 300,
+        index_max_nodes: int = 100000,
+        layout_max_nodes: int = 2000,
+    ):
+        self._client = httpx.AsyncClient(
+            base_url=endpoint.rstrip("/"),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            timeout=httpx.Timeout(timeout),
+        )
+        self._cache: LRUCache[GraphPayload] = LRUCache(
+            max_entries=cache_entries, ttl=cache_ttl
+        )
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._index: Optional[GraphIndex] = None
+        self._index_refresh_interval = index_refresh_interval
+        self._index_max_nodes = index_max_nodes
+        self._index_task: Optional[asyncio.Task] = None
+        self.layout_max_nodes = layout_max_nodes
+
+    def start(self):
+        if self._index_refresh_interval > 0 and self._index_task is None:
+            self._index_task = asyncio.create_task(self._refresh_index_loop())
+
+    async def aclose(self):
+        if self._index_task is not None:
+            self._index_task.cancel()
+            try:
+                await self._index_task
+            except asyncio.CancelledError:
+                pass
+            self._index_task = None
+        await self._client.aclose()
+
+    @property
+    def index(self) -> Optional[GraphIndex]:
+        return self._index
+
+    async def refresh_index(self):
+        export = await self._fetch(
+            "/graphs",
+            {"label": "*", "max_depth": 1, "max_nodes": self._index_max_nodes},
+        )
+        labels = await self._fetch("/graph/label/list")
+        index = await asyncio.to_thread(GraphIndex.from_export, export, labels)
+        if self._index is None or self._index.version != index.version:
+            self._index = index
+            self._cache.clear()
+
+    async def _refresh_index_loop(self):
+        while True:
+            try:
+                await self.refresh_index()
+            except Exception as e:
+                print(f"Graph index refresh failed: {e}", flush=True)
+            await asyncio.sleep(self._index_refresh_interval)
+
+    def invalidate(self):
+        self._cache.clear()
+
+    async def _cached(
+        self, key: Hashable, load: Callable[[], Awaitable[GraphPayload]]
+    ) -> GraphPayload:
+        payload = self._cache.get(key)
+        if payload is not None:
+            return payload
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            payload = await load()
+            self._cache.put(key, payload)
+            future.set_result(payload)
+            return payload
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _fetch(
+        self, path: str, params: Optional[Dict] = None, guarded: bool = True
+    ) -> bytes:
+        call = UpstreamCall("lightrag", path, guarded=guarded)
+        try:
+            response = await self._client.get(path, params=params)
+            if response.status_code != 200:
+                raise GraphServiceError(
+                    f"LightRAG request failed (HTTP {response.status_code})"
+                )
+            call.outcome = "success"
+            return response.content
+        except httpx.HTTPError as e:
+            call.fail(e)
+            raise GraphServiceError(f"LightRAG request failed: {e}")
+        except GraphServiceError as e:
+            call.fail(e)
+            raise
+        finally:
+            call.finish()
+
+    async def health(self) -> Any:
+        return json.loads(await self._fetch("/health", guarded=False))
+
+    async def get_graph(
+        self, label: str, max_depth: int, max_nodes: int, layout: bool = False
+    ) -> GraphPayload:
+        index = self._index
+        if index is not None and index.can_serve(label):
+
+            async def load_from_index() -> GraphPayload:
+                graph = index.subgraph(label, max_depth, max_nodes)
+                if layout:
+                    graph = await asyncio.to_thread(
+                        apply_layout, graph, max_nodes=self.layout_max_nodes
+                    )
+                return GraphPayload.from_data(graph)
+
+            return await self._cached(
+                ("graph", index.version, label, max_depth, max_nodes, layout),
+                load_from_index,
+            )
+
+        async def load() -> GraphPayload:
+            body = await self._fetch(
+                "/graphs",
+                {"label": label, "max_depth": max_depth, "max_nodes": max_nodes},
+            )
+            if not layout:
+                return GraphPayload.from_bytes(body)
+            return GraphPayload.from_data(
+                await asyncio.to_thread(
+                    apply_layout, json.loads(body), max_nodes=self.layout_max_nodes
+                )
+            )
+
+        return await self._cached(
+            ("graph", label, max_depth, max_nodes, layout), load
+        )
+
+    async def get_labels(
+        self, prefix: Optional[str] = None, limit: int = 50
+    ) -> GraphPayload:
+        index = self._index
+        if index is not None:
+
+            async def load_from_index() -> GraphPayload:
+                if prefix:
+                    return GraphPayload.from_data(index.search_labels(prefix, limit))
+                return GraphPayload.from_data(index.labels)
+
+            return await self._cached(
+                ("labels", index.version, prefix, limit if prefix else None),
+                load_from_index,
+            )
+
+        async def load() -> GraphPayload:
+            body = await self._fetch("/graph/label/list")
+            if not prefix:
+                return GraphPayload.from_bytes(body)
+            key = prefix.casefold()
+            labels = [
+                label for label in json.loads(body) if label.casefold().startswith(key)
+            ]
+            return GraphPayload.from_data(labels[:limit])
+
+        return await self._cached(
+            ("labels", prefix, limit if prefix else None), load
+        )
@@ -0,0 +1,108 @@
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+Probe = Callable[[], Awaitable[Any]]
+
+
+@dataclass
+class ProbeResult:
+    online: bool
+    latency: float
+    checked_at: float
+    error: Optional[str] = None
+    detail: Any = None
+
+
+@dataclass
+class ProbeHistory:
+    results: Deque[ProbeResult]
+
+    @property
+    def latest(self) -> Optional[ProbeResult]:
+        return self.results[-1] if self.results else None
+
+    @property
+    def availability(self) -> Optional[float]:
+        if not self.results:
+            return None
+        return sum(result.online for result in self.results) / len(self.results)
+
+    @property
+    def average_latency(self) -> Optional[float]:
+        latencies = [result.latency for result in self.results if result.online]
+        if not latencies:
+            return None
+        return sum(latencies) / len(latencies)
+
+
+class HealthMonitor:
+    def __init__(
+        self,
+        probes: Dict[str, Probe],
+        interval: float = 15,
+        timeout: float = 5,
+        history_size: int = 40,
+    ):
+        self._probes = probes
+        self._interval = interval
+        self._timeout = timeout
+        self._histories = {
+            name: ProbeHistory(results=deque(maxlen=history_size)) for name in probes
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await self.check()
+            await asyncio.sleep(self._interval)
+
+    async def _probe(self, name: str):
+        started = time.perf_counter()
+        try:
+            detail = await asyncio.wait_for(self._probes[name](), timeout=self._timeout)
+            result = ProbeResult(
+                online=True,
+                latency=time.perf_counter() - started,
+                checked_at=time.time(),
+                detail=detail,
+            )
+        except Exception as e:
+            result = ProbeResult(
+                online=False,
+                latency=time.perf_counter() - started,
+                checked_at=time.time(),
+                error=str(e) or type(e).__name__,
+            )
+        self._histories[name].results.append(result)
+
+    async def check(self):
+        await asyncio.gather(*(self._probe(name) for name in self._probes))
+
+    def latest(self, name: str) -> Optional[ProbeResult]:
+        return self._histories[name].latest
+
+    def online(self, name: str) -> bool:
+        result = self.latest(name)
+        return result is not None and result.online
+
+    def history(self, name: str) -> ProbeHistory:
+        return self._histories[name]
+
+    def names(self) -> List[str]:
+        return list(self._histories)
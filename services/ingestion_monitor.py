@@ -0,0 +1,139 @@
+import asyncio
+import contextvars
+from dataclasses import asdict, dataclass, field
+from typing import AsyncGenerator, Dict, List, Optional, Set
+
+from services.rag_service import Document, RAGService
+
+
+@dataclass
+class DatasetWatcher:
+    dataset_id: str
+    subscribers: Set[asyncio.Queue] = field(default_factory=set)
+    documents: Optional[Dict[str, Document]] = None
+    task: Optional[asyncio.Task] = None
+
+
+class IngestionMonitor:
+    def __init__(
+        self,
+        rag_service: RAGService,
+        poll_interval: float = 3,
+        heartbeat_interval: float = 15,
+        page_size: int = 100,
+        queue_size: int = 256,
+    ):
+        self._rag_service = rag_service
+        self._poll_interval = poll_interval
+        self._heartbeat_interval = heartbeat_interval
+        self._page_size = page_size
+        self._queue_size = queue_size
+        self._watchers: Dict[str, DatasetWatcher] = {}
+
+    async def aclose(self):
+        for watcher in list(self._watchers.values()):
+            await self._stop(watcher)
+        self._watchers.clear()
+
+    @staticmethod
+    def _publish(queue: asyncio.Queue, event: Dict):
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(event)
+
+    def _broadcast(self, watcher: DatasetWatcher, event: Dict):
+        for queue in watcher.subscribers:
+            self._publish(queue, event)
+
+    async def _stop(self, watcher: DatasetWatcher):
+        if watcher.task is not None:
+            watcher.task.cancel()
+            try:
+                await watcher.task
+            except asyncio.CancelledError:
+                pass
+            watcher.task = None
+
+    async def _list_documents(self, dataset_id: str) -> List[Document]:
+        documents: List[Document] = []
+        page = 1
+        while True:
+            batch, document_count = await self._rag_service.list_documents(
+                dataset_id, page=page, page_size=self._page_size
+            )
+            documents.extend(batch)
+            if not batch or len(documents) >= document_count:
+                return documents
+            page += 1
+
+    async def _poll(self, watcher: DatasetWatcher):
+        while True:
+            try:
+                documents = {
+                    document.id: document
+                    for document in await self._list_documents(watcher.dataset_id)
+                }
+            except Exception as e:
+                self._broadcast(watcher, {"type": "error", "message": str(e)})
+            else:
+                previous = watcher.documents
+                watcher.documents = documents
+                if previous is None:
+                    self._broadcast(
+                        watcher,
+                        {
+                            "type": "snapshot",
+                            "documents": [
+                                asdict(document) for document in documents.values()
+                            ],
+                        },
+                    )
+                else:
+                    for document_id, document in documents.items():
+                        if previous.get(document_id) != document:
+                            self._broadcast(
+                                watcher,
+                                {"type": "progress", "document": asdict(document)},
+                            )
+                    for document_id in previous.keys() - documents.keys():
+                        self._broadcast(
+                            watcher, {"type": "removed", "document_id": document_id}
+                        )
+            await asyncio.sleep(self._poll_interval)
+
+    async def events(self, dataset_id: str) -> AsyncGenerator[Optional[Dict], None]:
+        watcher = self._watchers.get(dataset_id)
+        if watcher is None:
+            watcher = DatasetWatcher(dataset_id=dataset_id)
+            self._watchers[dataset_id] = watcher
+
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._queue_size)
+        if watcher.documents is not None:
+            self._publish(
+                queue,
+                {
+                    "type": "snapshot",
+                    "documents": [
+                        asdict(document) for document in watcher.documents.values()
+                    ],
+                },
+            )
+        watcher.subscribers.add(queue)
+        if watcher.task is None:
+            watcher.task = asyncio.create_task(
+                self._poll(watcher), context=contextvars.Context()
+            )
+
+        try:
+            while True:
+                try:
+                    yield await asyncio.wait_for(
+                        queue.get(), timeout=self._heartbeat_interval
+                    )
+                except asyncio.TimeoutError:
+                    yield None
+        finally:
+            watcher.subscribers.discard(queue)
+            if not watcher.subscribers and self._watchers.get(dataset_id) is watcher:
+                del self._watchers[dataset_id]
+                await self._stop(watcher)
@@ -0,0 +1,474 @@
+import asyncio
+import fcntl
+import re
+import sqlite3
+import threading
+import time
+from typing import IO, List, Optional, Tuple
+
+from services.rag_service import (
+    Chunk,
+    Dataset,
+    Document,
+    RAGService,
+    ResultChunk,
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS datasets (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    document_count INTEGER NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    synced_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS documents (
+    id TEXT PRIMARY KEY,
+    dataset_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    token_count INTEGER NOT NULL,
+    chunk_count INTEGER NOT NULL,
+    progress REAL NOT NULL,
+    progress_message TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    synced_chunk_count INTEGER,
+    synced_token_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_documents_dataset ON documents(dataset_id, position);
+CREATE TABLE IF NOT EXISTS chunks (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL,
+    dataset_id TEXT NOT NULL,
+    document_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    available INTEGER NOT NULL,
+    content TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_chunks_document ON chunks(document_id, position);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(
+    content, content='chunks', content_rowid='rowid', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS chunks_ai AFTER INSERT ON chunks BEGIN
+    INSERT INTO chunks_fts(rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS chunks_ad AFTER DELETE ON chunks BEGIN
+    INSERT INTO chunks_fts(chunks_fts, rowid, content)
+    VALUES ('delete', old.rowid, old.content);
+END;
+"""
+
+MAX_QUERY_TERMS = 64
+
+
+class KnowledgeMirror:
+    def __init__(
+        self,
+        rag_service: RAGService,
+        path: str,
+        sync_interval: float = 600,
+        page_size: int = 100,
+        busy_timeout: float = 30,
+    ):
+        self._rag_service = rag_service
+        self._path = path
+        self._sync_interval = sync_interval
+        self._page_size = page_size
+        self._busy_timeout = busy_timeout
+        self._db: Optional[sqlite3.Connection] = None
+        self._open_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._sync_lock_file: Optional[IO] = None
+        self._sync_task: Optional[asyncio.Task] = None
+
+    def open(self) -> sqlite3.Connection:
+        if self._db is None:
+            with self._open_lock:
+                if self._db is None:
+                    connection = sqlite3.connect(
+                        self._path,
+                        timeout=self._busy_timeout,
+                        check_same_thread=False,
+                    )
+                    connection.execute("PRAGMA journal_mode=WAL")
+                    connection.executescript(SCHEMA)
+                    self._db = connection
+        return self._db
+
+    @property
+    def _connection(self) -> sqlite3.Connection:
+        return self.open()
+
+    def start(self):
+        self.open()
+        if self._sync_interval > 0 and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync_loop())
+
+    def _acquire_sync_lock(self) -> bool:
+        if self._sync_lock_file is not None:
+            return True
+        lock_file = open(f"{self._path}.sync-lock", "a")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._sync_lock_file = lock_file
+        return True
+
+    async def aclose(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+            self._sync_task = None
+        if self._sync_lock_file is not None:
+            self._sync_lock_file.close()
+            self._sync_lock_file = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _execute(self, sql: str, parameters=()) -> List[tuple]:
+        with self._lock:
+            return self._connection.execute(sql, parameters).fetchall()
+
+    async def _sync_loop(self):
+        while True:
+            if self._acquire_sync_lock():
+                try:
+                    await self.sync()
+                except Exception as e:
+                    print(f"Knowledge mirror sync failed: {e}", flush=True)
+            await asyncio.sleep(self._sync_interval)
+
+    async def sync(self):
+        datasets = await self._rag_service.list_datasets()
+        await asyncio.to_thread(self._store_datasets, datasets)
+        for dataset in datasets:
+            await self._sync_dataset(dataset.id)
+
+    def _store_datasets(self, datasets: List[Dataset]):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"DELETE FROM chunks WHERE dataset_id NOT IN ({','.join('?' * len(datasets))})",
+                [dataset.id for dataset in datasets],
+            )
+            self._connection.execute(
+                f"DELETE FROM documents WHERE dataset_id NOT IN ({','.join('?' * len(datasets))})",
+                [dataset.id for dataset in datasets],
+            )
+            self._connection.execute(
+                f"DELETE FROM datasets WHERE id NOT IN ({','.join('?' * len(datasets))})",
+                [dataset.id for dataset in datasets],
+            )
+            self._connection.executemany(
+                """
+                INSERT INTO datasets (id, name, document_count, chunk_count, synced_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    name = excluded.name,
+                    document_count = excluded.document_count,
+                    chunk_count = excluded.chunk_count,
+                    synced_at = excluded.synced_at
+                """,
+                [
+                    (
+                        dataset.id,
+                        dataset.name,
+                        dataset.document_count,
+                        dataset.chunk_count,
+                        now,
+                    )
+                    for dataset in datasets
+                ],
+            )
+
+    async def _sync_dataset(self, dataset_id: str):
+        documents: List[Document] = []
+        page = 1
+        while True:
+            batch, document_count = await self._rag_service.list_documents(
+                dataset_id, page=page, page_size=self._page_size
+            )
+            documents.extend(batch)
+            if not batch or len(documents) >= document_count:
+                break
+            page += 1
+
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT id, synced_chunk_count, synced_token_count FROM documents WHERE dataset_id = ?",
+            (dataset_id,),
+        )
+        synced = {row[0]: (row[1], row[2]) for row in rows}
+        await asyncio.to_thread(self._store_documents, dataset_id, documents)
+
+        for document in documents:
+            if document.progress < 1:
+                continue
+            if synced.get(document.id) == (document.chunk_count, document.token_count):
+                continue
+            chunks = await self._fetch_chunks(dataset_id, document.id)
+            await asyncio.to_thread(
+                self._store_chunks, dataset_id, document, chunks
+            )
+
+    async def _fetch_chunks(self, dataset_id: str, document_id: str) -> List[Chunk]:
+        chunks: List[Chunk] = []
+        page = 1
+        while True:
+            batch, chunk_count = await self._rag_service.list_chunks(
+                dataset_id, document_id, page=page, page_size=self._page_size
+            )
+            chunks.extend(batch)
+            if not batch or len(chunks) >= chunk_count:
+                return chunks
+            page += 1
+
+    def _store_documents(self, dataset_id: str, documents: List[Document]):
+        ids = [document.id for document in documents]
+        placeholders = ",".join("?" * len(ids))
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"DELETE FROM chunks WHERE dataset_id = ? AND document_id NOT IN ({placeholders})",
+                [dataset_id, *ids],
+            )
+            self._connection.execute(
+                f"DELETE FROM documents WHERE dataset_id = ? AND id NOT IN ({placeholders})",
+                [dataset_id, *ids],
+            )
+            self._connection.executemany(
+                """
+                INSERT INTO documents (
+                    id, dataset_id, name, size, token_count, chunk_count,
+                    progress, progress_message, position
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    name = excluded.name,
+                    size = excluded.size,
+                    token_count = excluded.token_count,
+                    chunk_count = excluded.chunk_count,
+                    progress = excluded.progress,
+                    progress_message = excluded.progress_message,
+                    position = excluded.position
+                """,
+                [
+                    (
+                        document.id,
+                        dataset_id,
+                        document.name,
+                        document.size,
+                        document.token_count,
+                        document.chunk_count,
+                        document.progress,
+                        document.progress_message,
+                        position,
+                    )
+                    for position, document in enumerate(documents)
+                ],
+            )
+            for document in documents:
+                if document.progress < 1:
+                    self._connection.execute(
+                        "DELETE FROM chunks WHERE document_id = ?", (document.id,)
+                    )
+                    self._connection.execute(
+                        "UPDATE documents SET synced_chunk_count = NULL, synced_token_count = NULL WHERE id = ?",
+                        (document.id,),
+                    )
+
+    def _store_chunks(self, dataset_id: str, document: Document, chunks: List[Chunk]):
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM chunks WHERE document_id = ?", (document.id,)
+            )
+            self._connection.executemany(
+                """
+                INSERT INTO chunks (id, dataset_id, document_id, position, available, content)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                [
+                    (
+                        chunk.id,
+                        dataset_id,
+                        document.id,
+                        position,
+                        int(chunk.available),
+                        chunk.content,
+                    )
+                    for position, chunk in enumerate(chunks)
+                ],
+            )
+            self._connection.execute(
+                "UPDATE documents SET synced_chunk_count = ?, synced_token_count = ? WHERE id = ?",
+                (document.chunk_count, document.token_count, document.id),
+            )
+
+    async def list_datasets(self) -> List[Dataset]:
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT name, id, document_count, chunk_count FROM datasets ORDER BY rowid",
+        )
+        return [
+            Dataset(name=row[0], id=row[1], document_count=row[2], chunk_count=row[3])
+            for row in rows
+        ]
+
+    async def list_documents(
+        self, dataset_id: str, page: int = 1, page_size: int = 30
+    ) -> Optional[Tuple[List[Document], int]]:
+        count = await asyncio.to_thread(
+            self._execute,
+            "SELECT document_count FROM datasets WHERE id = ?",
+            (dataset_id,),
+        )
+        if not count:
+            return None
+        rows = await asyncio.to_thread(
+            self._execute,
+            """
+            SELECT id, name, size, token_count, chunk_count, progress, progress_message
+            FROM documents WHERE dataset_id = ?
+            ORDER BY position LIMIT ? OFFSET ?
+            """,
+            (dataset_id, page_size, max(page - 1, 0) * page_size),
+        )
+        return [
+            Document(
+                id=row[0],
+                name=row[1],
+                size=row[2],
+                token_count=row[3],
+                chunk_count=row[4],
+                progress=row[5],
+                progress_message=row[6],
+            )
+            for row in rows
+        ], count[0][0]
+
+    async def list_chunks(
+        self, dataset_id: str, document_id: str, page: int = 1, page_size: int = 30
+    ) -> Optional[Tuple[List[Chunk], int]]:
+        synced = await asyncio.to_thread(
+            self._execute,
+            """
+            SELECT synced_chunk_count FROM documents
+            WHERE id = ? AND dataset_id = ? AND synced_chunk_count IS NOT NULL
+            """,
+            (document_id, dataset_id),
+        )
+        if not synced:
+            return None
+        rows = await asyncio.to_thread(
+            self._execute,
+            """
+            SELECT available, content, id FROM chunks WHERE document_id = ?
+            ORDER BY position LIMIT ? OFFSET ?
+            """,
+            (document_id, page_size, max(page - 1, 0) * page_size),
+        )
+        return [
+            Chunk(available=bool(row[0]), content=row[1], id=row[2]) for row in rows
+        ], synced[0][0]
+
+    @staticmethod
+    def _query_terms(question: str) -> List[str]:
+        terms = []
+        for segment in re.split(r"[\s\W_]+", question.casefold()):
+            for i in range(max(len(segment) - 2, 0)):
+                term = segment[i : i + 3]
+                if term not in terms:
+                    terms.append(term)
+        return terms[:MAX_QUERY_TERMS]
+
+    @staticmethod
+    def _highlight(content: str, terms: List[str]) -> Tuple[str, float]:
+        folded = content.casefold()
+        spans = []
+        matched = 0
+        for term in terms:
+            start = folded.find(term)
+            if start < 0:
+                continue
+            matched += 1
+            while start >= 0:
+                spans.append((start, start + len(term)))
+                start = folded.find(term, start + 1)
+        if not spans or len(folded) != len(content):
+            return content, matched / len(terms) if terms else 0.0
+
+        merged = []
+        for start, end in sorted(spans):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        parts = []
+        cursor = 0
+        for start, end in merged:
+            parts.append(content[cursor:start])
+            parts.append(f"<em>{content[start:end]}</em>")
+            cursor = end
+        parts.append(content[cursor:])
+        return "".join(parts), matched / len(terms)
+
+    async def search(
+        self,
+        question: str,
+        dataset_ids: List[str],
+        document_ids: Optional[List[str]] = None,
+        page: int = 1,
+        page_size: int = 30,
+        top_k: int = 1024,
+    ) -> Tuple[List[ResultChunk], int]:
+        filters = [f"c.dataset_id IN ({','.join('?' * len(dataset_ids))})"]
+        parameters: list = list(dataset_ids)
+        if document_ids:
+            filters.append(f"c.document_id IN ({','.join('?' * len(document_ids))})")
+            parameters.extend(document_ids)
+
+        terms = self._query_terms(question)
+        if terms:
+            expression = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+            sql = f"""
+                SELECT c.id, c.content
+                FROM chunks_fts JOIN chunks c ON c.rowid = chunks_fts.rowid
+                WHERE chunks_fts MATCH ? AND c.available = 1 AND {' AND '.join(filters)}
+                ORDER BY bm25(chunks_fts) LIMIT ?
+            """
+            parameters = [expression, *parameters, top_k]
+        else:
+            terms = [keyword.casefold() for keyword in question.split()]
+            if not terms:
+                return [], 0
+            filters.extend("c.content LIKE ?" for _ in terms)
+            parameters.extend(f"%{keyword}%" for keyword in terms)
+            sql = f"""
+                SELECT c.id, c.content
+                FROM chunks c
+                WHERE c.available = 1 AND {' AND '.join(filters)}
+                ORDER BY c.document_id, c.position LIMIT ?
+            """
+            parameters.append(top_k)
+
+        rows = await asyncio.to_thread(self._execute, sql, parameters)
+        start = max(page - 1, 0) * page_size
+        result_chunks = []
+        for chunk_id, content in rows[start : start + page_size]:
+            highlighted_content, similarity = self._highlight(content, terms)
+            result_chunks.append(
+                ResultChunk(
+                    id=chunk_id,
+                    content=content,
+                    highlighted_content=highlighted_content,
+                    similarity=similarity,
+                    term_similarity=similarity,
+                    vector_similarity=0.0,
+                )
+            )
+        return result_chunks, len(rows)
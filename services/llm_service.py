@@ -6,6 +6,8 @@ from typing import List
 from dotenv import load_dotenv
 from openai import OpenAI
 
+from services.metrics import timed
+
 
 class Role(enum.Enum):
     SYSTEM = "system"
@@ -26,6 +28,7 @@ class LLMService:
             base_url=endpoint,
         )
 
+    @timed("llm")
     def chat(self, model: str, messages: List[Message]) -> Message:
         response = self._client.chat.completions.create(
             model=model,
@@ -38,6 +41,10 @@ class LLMService:
 
         return Message(role=Role.ASSISTANT, content=response.choices[0].message.content)
 
+    def ping(self, timeout: float):
+        self._client.with_options(timeout=timeout, max_retries=0).models.list()
+
+    @timed("llm")
     def chat_stream(self, model: str, messages: List[Message]):
         response = self._client.chat.completions.create(
             model=model,
@@ -0,0 +1,331 @@
+import asyncio
+import contextvars
+import functools
+import inspect
+import os
+import time
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+from services.circuit_breaker import CircuitOpenError, circuit_breakers, is_failure
+from services.tracing import tracer
+
+try:
+    from prometheus_client import (
+        CONTENT_TYPE_LATEST,
+        CollectorRegistry,
+        Counter,
+        Histogram,
+        generate_latest,
+        multiprocess,
+    )
+
+    PROMETHEUS_AVAILABLE = True
+except ImportError:
+    PROMETHEUS_AVAILABLE = False
+    CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+)
+SIZE_BUCKETS = (100, 1000, 10000, 100000, 1000000, 10000000, 100000000)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+if PROMETHEUS_AVAILABLE:
+    HTTP_REQUESTS = Counter(
+        "http_requests_total",
+        "HTTP requests by route template and status",
+        ["method", "route", "status"],
+    )
+    HTTP_REQUEST_DURATION = Histogram(
+        "http_request_duration_seconds",
+        "Time from request start to the last response byte",
+        ["method", "route"],
+        buckets=LATENCY_BUCKETS,
+    )
+    HTTP_RESPONSE_FIRST_BYTE = Histogram(
+        "http_response_first_byte_seconds",
+        "Time from request start to the first response body byte",
+        ["method", "route"],
+        buckets=LATENCY_BUCKETS,
+    )
+    HTTP_REQUEST_SIZE = Histogram(
+        "http_request_size_bytes",
+        "Request body size",
+        ["method", "route"],
+        buckets=SIZE_BUCKETS,
+    )
+    HTTP_RESPONSE_SIZE = Histogram(
+        "http_response_size_bytes",
+        "Response body size",
+        ["method", "route"],
+        buckets=SIZE_BUCKETS,
+    )
+    UPSTREAM_DURATION = Histogram(
+        "upstream_request_duration_seconds",
+        "Upstream call duration by service, operation and outcome",
+        ["service", "operation", "outcome"],
+        buckets=LATENCY_BUCKETS,
+    )
+    UPSTREAM_FIRST_ITEM = Histogram(
+        "upstream_stream_first_item_seconds",
+        "Time until a streaming upstream call yields its first item",
+        ["service", "operation"],
+        buckets=LATENCY_BUCKETS,
+    )
+    UPSTREAM_REJECTED = Counter(
+        "upstream_circuit_rejections_total",
+        "Upstream calls rejected by an open circuit breaker",
+        ["service", "operation"],
+    )
+    EVENT_LOOP_LAG = Histogram(
+        "event_loop_lag_seconds",
+        "Delay between a scheduled event loop wakeup and when it ran",
+        buckets=LOOP_LAG_BUCKETS,
+    )
+
+
+def observe_request(
+    method: str,
+    route: str,
+    status: int,
+    duration: float,
+    first_byte: Optional[float],
+    request_size: int,
+    response_size: int,
+):
+    if not PROMETHEUS_AVAILABLE:
+        return
+    HTTP_REQUESTS.labels(method, route, str(status)).inc()
+    HTTP_REQUEST_DURATION.labels(method, route).observe(duration)
+    if first_byte is not None:
+        HTTP_RESPONSE_FIRST_BYTE.labels(method, route).observe(first_byte)
+    HTTP_REQUEST_SIZE.labels(method, route).observe(request_size)
+    HTTP_RESPONSE_SIZE.labels(method, route).observe(response_size)
+
+
+def observe_upstream(service: str, operation: str, outcome: str, duration: float):
+    if PROMETHEUS_AVAILABLE:
+        UPSTREAM_DURATION.labels(service, operation, outcome).observe(duration)
+
+
+def observe_first_item(service: str, operation: str, duration: float):
+    if PROMETHEUS_AVAILABLE:
+        UPSTREAM_FIRST_ITEM.labels(service, operation).observe(duration)
+
+
+def observe_rejected(service: str, operation: str):
+    if PROMETHEUS_AVAILABLE:
+        UPSTREAM_REJECTED.labels(service, operation).inc()
+
+
+upstream_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "upstream_deadline", default=None
+)
+
+
+async def wait_for_upstream(awaitable: Awaitable[Any], timeout: float) -> Any:
+    token = upstream_deadline.set(time.monotonic() + timeout)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    finally:
+        upstream_deadline.reset(token)
+
+
+class UpstreamCall:
+    def __init__(
+        self,
+        service: str,
+        operation: str,
+        streaming: bool = False,
+        guarded: bool = True,
+    ):
+        self._service = service
+        self._operation = operation
+        self._breaker = circuit_breakers.get(service) if guarded else None
+        self._probe = False
+        if self._breaker is not None:
+            try:
+                self._probe = self._breaker.acquire()
+            except CircuitOpenError:
+                observe_rejected(service, operation)
+                raise
+        self._started = time.perf_counter()
+        self._first_item: Optional[float] = None
+        self.outcome = "cancelled"
+        self.error: Optional[BaseException] = None
+        self._span = tracer.begin_span(
+            f"{service}.{operation}",
+            "upstream",
+            activate=not streaming,
+            service=service,
+            operation=operation,
+        )
+
+    def item(self):
+        if self._first_item is None:
+            elapsed = time.perf_counter() - self._started
+            self._first_item = elapsed
+            observe_first_item(self._service, self._operation, elapsed)
+            if self._span is not None:
+                self._span[0].attributes["first_item_seconds"] = elapsed
+
+    def fail(self, error: BaseException):
+        self.outcome = "error"
+        self.error = error
+
+    def finish(self):
+        duration = time.perf_counter() - self._started
+        deadline = upstream_deadline.get()
+        if (
+            self.outcome == "cancelled"
+            and deadline is not None
+            and time.monotonic() >= deadline
+        ):
+            self.outcome = "timeout"
+            self.error = asyncio.TimeoutError()
+        observe_upstream(self._service, self._operation, self.outcome, duration)
+        tracer.end_span(self._span, self.error)
+        if self._breaker is None:
+            return
+        if self.outcome == "cancelled":
+            self._breaker.release(self._probe)
+        elif self.outcome == "timeout":
+            self._breaker.record(float("inf"), True, self._probe)
+        else:
+            self._breaker.record(
+                self._first_item if self._first_item is not None else duration,
+                self.error is not None and is_failure(self.error),
+                self._probe,
+            )
+
+
+def timed(
+    service: str, operation: Optional[str] = None, guarded: bool = True
+) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        name = operation or func.__name__
+
+        if inspect.isasyncgenfunction(func):
+
+            @functools.wraps(func)
+            async def async_generator_wrapper(*args, **kwargs):
+                call = UpstreamCall(service, name, streaming=True, guarded=guarded)
+                try:
+                    async for item in func(*args, **kwargs):
+                        call.item()
+                        yield item
+                    call.outcome = "success"
+                except Exception as e:
+                    call.fail(e)
+                    raise
+                finally:
+                    call.finish()
+
+            return async_generator_wrapper
+
+        if inspect.isgeneratorfunction(func):
+
+            @functools.wraps(func)
+            def generator_wrapper(*args, **kwargs):
+                call = UpstreamCall(service, name, streaming=True, guarded=guarded)
+                try:
+                    for item in func(*args, **kwargs):
+                        call.item()
+                        yield item
+                    call.outcome = "success"
+                except Exception as e:
+                    call.fail(e)
+                    raise
+                finally:
+                    call.finish()
+
+            return generator_wrapper
+
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                call = UpstreamCall(service, name, guarded=guarded)
+                try:
+                    result = await func(*args, **kwargs)
+                    call.outcome = "success"
+                    return result
+                except Exception as e:
+                    call.fail(e)
+                    raise
+                finally:
+                    call.finish()
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            call = UpstreamCall(service, name, guarded=guarded)
+            try:
+                result = func(*args, **kwargs)
+                call.outcome = "success"
+                return result
+            except Exception as e:
+                call.fail(e)
+                raise
+            finally:
+                call.finish()
+
+        return wrapper
+
+    return decorator
+
+
+def render_metrics() -> Tuple[bytes, str]:
+    if not PROMETHEUS_AVAILABLE:
+        raise RuntimeError("prometheus_client package is required for metrics")
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead():
+    if PROMETHEUS_AVAILABLE and os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(os.getpid())
+
+
+class EventLoopLagMonitor:
+    def __init__(self, interval: float = 0.5):
+        self._interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if PROMETHEUS_AVAILABLE and self._interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self._interval)
+            EVENT_LOOP_LAG.observe(
+                max(0.0, time.perf_counter() - started - self._interval)
+            )
@@ -4,6 +4,8 @@ from dataclasses import dataclass
 import requests
 from dotenv import load_dotenv
 
+from services.metrics import timed
+
 
 @dataclass
 class Result:
@@ -21,6 +23,12 @@ class OCRService:
             }
         )
 
+    def ping(self, timeout: float):
+        response = self._session.get(url=self._endpoint, timeout=timeout)
+        if response.status_code >= 500:
+            raise Exception("OCR service error")
+
+    @timed("ocr")
     def normal_ocr(self, image_data: bytes) -> Result:
         response = self._session.post(
             url=f"{self._endpoint}/latex_ocr",
@@ -36,6 +44,7 @@ class OCRService:
 
         return Result(content=data["res"]["latex"], confidence=data["res"]["conf"])
 
+    @timed("ocr")
     def turbo_ocr(self, image_data: bytes) -> Result:
         response = self._session.post(
             url=f"{self._endpoint}/latex_ocr_turbo",
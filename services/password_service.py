@@ -0,0 +1,86 @@
+import asyncio
+import multiprocessing
+import secrets
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from passlib.context import CryptContext
+
+_password_context: Optional[CryptContext] = None
+
+
+def _create_context(rounds: int) -> CryptContext:
+    return CryptContext(
+        schemes=["bcrypt"],
+        deprecated="auto",
+        bcrypt__default_rounds=rounds,
+        bcrypt__min_rounds=rounds,
+        bcrypt__max_rounds=rounds,
+    )
+
+
+def _init_worker(rounds: int):
+    global _password_context
+    _password_context = _create_context(rounds)
+
+
+def _hash(password: str) -> str:
+    return _password_context.hash(password)
+
+
+def _verify_and_update(password: str, password_hash: str) -> Tuple[bool, Optional[str]]:
+    return _password_context.verify_and_update(password, password_hash)
+
+
+class PasswordServiceBusyError(Exception):
+    pass
+
+
+class PasswordService:
+    def __init__(self, workers: int = 2, max_pending: int = 64, rounds: int = 12):
+        self._workers = workers
+        self._rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._max_pending = max_pending
+        self._pending = 0
+        self._dummy_hash: Optional[str] = None
+
+    def start(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self._rounds,),
+            )
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    async def _submit(self, fn, *args):
+        if self._pending >= self._max_pending:
+            raise PasswordServiceBusyError("Too many pending password operations")
+        self.start()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(
+                self._executor, fn, *args
+            )
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(_hash, password)
+
+    async def verify_and_update(
+        self, password: str, password_hash: str
+    ) -> Tuple[bool, Optional[str]]:
+        return await self._submit(_verify_and_update, password, password_hash)
+
+    async def verify_dummy(self, password: str) -> bool:
+        if self._dummy_hash is None:
+            self._dummy_hash = await self.hash(secrets.token_urlsafe(32))
+        valid, _ = await self.verify_and_update(password, self._dummy_hash)
+        return valid
@@ -0,0 +1,192 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Set
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _is_project_file(filename: str) -> bool:
+    return filename.startswith(PROJECT_ROOT) and "site-packages" not in filename
+
+
+def _frame_label(filename: str, name: str, lineno: Optional[int]) -> str:
+    if _is_project_file(filename):
+        filename = os.path.relpath(filename, PROJECT_ROOT)
+    return f"{name} ({filename}:{lineno})"
+
+
+def fold_stack(frame) -> str:
+    return ";".join(
+        _frame_label(summary.filename, summary.name, summary.lineno)
+        for summary in traceback.extract_stack(frame)
+    )
+
+
+def sample_stacks(
+    duration: float, interval: float, thread_ids: Optional[Set[int]] = None
+) -> Counter:
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    own = threading.get_ident()
+    counts: Counter = Counter()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own:
+                continue
+            if thread_ids is not None and thread_id not in thread_ids:
+                continue
+            counts[f"{names.get(thread_id, thread_id)};{fold_stack(frame)}"] += 1
+        time.sleep(interval)
+    return counts
+
+
+def folded_profile(counts: Counter) -> str:
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+@dataclass
+class Stall:
+    started_at: float
+    duration: float
+    location: str
+    stack: List[str]
+
+
+@dataclass
+class Offender:
+    count: int = 0
+    total_duration: float = 0.0
+    max_duration: float = 0.0
+
+
+@dataclass
+class StallReport:
+    threshold: float
+    offenders: Dict[str, Offender] = field(default_factory=dict)
+    recent: List[Stall] = field(default_factory=list)
+
+
+class LoopWatchdog:
+    def __init__(
+        self,
+        threshold: float = 0.1,
+        heartbeat_interval: float = 0.02,
+        recent_stalls: int = 100,
+        stack_depth: int = 30,
+    ):
+        self._threshold = threshold
+        self._heartbeat_interval = heartbeat_interval
+        self._stack_depth = stack_depth
+        self._stalls: Deque[Stall] = deque(maxlen=recent_stalls)
+        self._offenders: Dict[str, Offender] = {}
+        self._lock = threading.Lock()
+        self._beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def loop_thread_id(self) -> Optional[int]:
+        return self._loop_thread_id
+
+    def start(self):
+        if self._threshold <= 0 or self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._heartbeat())
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    async def aclose(self):
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join)
+            self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            self._beat = time.monotonic()
+            await asyncio.sleep(self._heartbeat_interval)
+
+    def _capture(self, lag: float) -> Optional[Stall]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return None
+        summaries = traceback.extract_stack(frame)
+        location = next(
+            (
+                summary
+                for summary in reversed(summaries)
+                if _is_project_file(summary.filename)
+            ),
+            summaries[-1],
+        )
+        return Stall(
+            started_at=time.time() - lag,
+            duration=lag,
+            location=_frame_label(location.filename, location.name, location.lineno),
+            stack=[
+                _frame_label(summary.filename, summary.name, summary.lineno)
+                for summary in summaries[-self._stack_depth :]
+            ],
+        )
+
+    def _watch(self):
+        stall: Optional[Stall] = None
+        stall_beat = None
+        while not self._stopped.wait(self._heartbeat_interval):
+            beat = self._beat
+            lag = time.monotonic() - beat - self._heartbeat_interval
+            if lag < self._threshold:
+                stall = None
+                continue
+            if stall is not None and stall_beat == beat:
+                with self._lock:
+                    offender = self._offenders[stall.location]
+                    offender.total_duration += lag - stall.duration
+                    offender.max_duration = max(offender.max_duration, lag)
+                    stall.duration = lag
+                continue
+            stall = self._capture(lag)
+            stall_beat = beat
+            if stall is None:
+                continue
+            with self._lock:
+                self._stalls.append(stall)
+                offender = self._offenders.setdefault(stall.location, Offender())
+                offender.count += 1
+                offender.total_duration += lag
+                offender.max_duration = max(offender.max_duration, lag)
+
+    def report(self) -> StallReport:
+        with self._lock:
+            return StallReport(
+                threshold=self._threshold,
+                offenders={
+                    location: Offender(
+                        count=offender.count,
+                        total_duration=offender.total_duration,
+                        max_duration=offender.max_duration,
+                    )
+                    for location, offender in self._offenders.items()
+                },
+                recent=list(self._stalls),
+            )
@@ -1,54 +1,34 @@
+import asyncio
 import enum
+import heapq
 import os
 import re
+from array import array
 from dataclasses import dataclass
-from typing import Dict, Generator, List, Optional, Tuple
+from itertools import islice
+from typing import (
+    AsyncGenerator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
 
-import requests
 from dotenv import load_dotenv
-from ragflow_sdk import RAGFlow, Session
-
-
-def patched_retrieve(
-    self,
-    dataset_ids,
-    document_ids=None,
-    question="",
-    page=1,
-    page_size=30,
-    similarity_threshold=0.2,
-    vector_similarity_weight=0.3,
-    top_k=1024,
-    rerank_id: str | None = None,
-    keyword: bool = False,
-):
-    if document_ids is None:
-        document_ids = []
-
-    data_json = {
-        "page": page,
-        "page_size": page_size,
-        "similarity_threshold": similarity_threshold,
-        "vector_similarity_weight": vector_similarity_weight,
-        "top_k": top_k,
-        "rerank_id": rerank_id,
-        "keyword": keyword,
-        "question": question,
-        "dataset_ids": dataset_ids,
-        "documents": document_ids,
-    }
-    res = self.post("/retrieval", json=data_json)
-    res = res.json()
-
-    if res.get("code") == 0:
-        chunks = []
-        for chunk_data in res["data"].get("chunks"):
-            chunks.append(chunk_data)
-        return chunks
-    raise Exception(res.get("message"))
-
-
-RAGFlow.retrieve = patched_retrieve
+
+from services.cache import LRUCache
+from services.metrics import wait_for_upstream
+from services.ragflow_client import (
+    RAGFlowClient,
+    RAGFlowError,
+    RAGFlowRetrievedChunk,
+    RAGFlowRetrieval,
+    RAGFlowSession,
+    RAGFlowTimeoutError,
+)
 
 
 @dataclass
@@ -87,6 +67,51 @@ class ResultChunk:
     vector_similarity: float
 
 
+class RetrievalSnapshot:
+    __slots__ = (
+        "ids",
+        "contents",
+        "highlighted_contents",
+        "similarities",
+        "term_similarities",
+        "vector_similarities",
+    )
+
+    def __init__(self, chunks: Iterable[RAGFlowRetrievedChunk]):
+        ids, contents, highlighted_contents = [], [], []
+        self.similarities = array("d")
+        self.term_similarities = array("d")
+        self.vector_similarities = array("d")
+        for chunk in chunks:
+            ids.append(chunk.id)
+            contents.append(chunk.content)
+            highlighted_contents.append(chunk.highlight)
+            self.similarities.append(chunk.similarity)
+            self.term_similarities.append(chunk.term_similarity)
+            self.vector_similarities.append(chunk.vector_similarity)
+        self.ids = tuple(ids)
+        self.contents = tuple(contents)
+        self.highlighted_contents = tuple(highlighted_contents)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def page(self, page: int, page_size: int) -> List[ResultChunk]:
+        start = max(page - 1, 0) * page_size
+        end = min(start + page_size, len(self.ids))
+        return [
+            ResultChunk(
+                id=self.ids[i],
+                content=self.contents[i],
+                highlighted_content=self.highlighted_contents[i],
+                similarity=self.similarities[i],
+                term_similarity=self.term_similarities[i],
+                vector_similarity=self.vector_similarities[i],
+            )
+            for i in range(start, end)
+        ]
+
+
 @dataclass
 class ReferenceChunk:
     id: str
@@ -118,18 +143,49 @@ class Message:
 
 
 class RAGService:
-    def __init__(self, token: str, endpoint: str):
+    def __init__(
+        self,
+        token: str,
+        endpoint: str,
+        retrieval_cache_entries: int = 256,
+        retrieval_cache_chunks: int = 65536,
+        retrieval_cache_ttl: float = 300,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30,
+        timeout: float = 30,
+        stream_timeout: float = 300,
+        http2: bool = True,
+        federated_timeout: float = 10,
+        document_owner_entries: int = 10000,
+    ):
         self._endpoint = endpoint
-        self._client = RAGFlow(api_key=token, base_url=endpoint)
+        self._federated_timeout = federated_timeout
+        self._client = RAGFlowClient(
+            token=token,
+            endpoint=endpoint,
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+            timeout=timeout,
+            stream_timeout=stream_timeout,
+            http2=http2,
+        )
+        self._retrieval_cache: LRUCache[RetrievalSnapshot] = LRUCache(
+            max_entries=retrieval_cache_entries,
+            max_weight=retrieval_cache_chunks,
+            ttl=retrieval_cache_ttl,
+            weigher=len,
+        )
+        self._document_owners: LRUCache[str] = LRUCache(
+            max_entries=document_owner_entries
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
 
-    def get_system_status(self, authorization: str) -> Optional[Dict]:
-        headers = {"authorization": authorization}
-        response = requests.get(f"{self._endpoint}/v1/system/status", headers=headers)
-        if response.status_code == 200:
-            result = response.json()
-            return result.get("data")
-        else:
-            return None
+    async def get_system_status(self, authorization: str) -> Optional[Dict]:
+        return await self._client.get_system_status(authorization)
 
     @staticmethod
     def extract_filter_and_reorder(text: str, input_list: List) -> Tuple[List, str]:
@@ -158,7 +214,7 @@ class RAGService:
             return 0
         return (total_items - 1) // page_size + 1
 
-    def list_datasets(self) -> List[Dataset]:
+    async def list_datasets(self) -> List[Dataset]:
         return [
             Dataset(
                 name=dataset.name,
@@ -166,13 +222,15 @@ class RAGService:
                 document_count=dataset.document_count,
                 chunk_count=dataset.chunk_count,
             )
-            for dataset in self._client.list_datasets()
+            for dataset in await self._client.list_datasets()
         ]
 
-    def list_documents(
+    async def list_documents(
         self, dataset_id: str, page: int = 1, page_size: int = 30
     ) -> Tuple[List[Document], int]:
-        dataset = self._client.list_datasets(id=dataset_id)[0]
+        documents, document_count = await self._client.list_documents(
+            dataset_id, page=page, page_size=page_size
+        )
         return [
             Document(
                 id=document.id,
@@ -183,25 +241,88 @@ class RAGService:
                 progress=document.progress,
                 progress_message=document.progress_msg,
             )
-            for document in dataset.list_documents(page=page, page_size=page_size)
-        ], dataset.document_count
+            for document in documents
+        ], document_count
 
-    def list_chunks(
+    async def list_chunks(
         self, dataset_id: str, document_id: str, page: int = 1, page_size: int = 30
     ) -> Tuple[List[Chunk], int]:
-        dataset = self._client.list_datasets(id=dataset_id)[0]
-        document = dataset.list_documents(id=document_id)[0]
-        chunk_count = document.chunk_count
+        chunks, chunk_count = await self._client.list_chunks(
+            dataset_id, document_id, page=page, page_size=page_size
+        )
         return [
             Chunk(
                 available=chunk.available,
                 content=chunk.content,
                 id=chunk.id,
             )
-            for chunk in document.list_chunks(page=page, page_size=page_size)
+            for chunk in chunks
         ], chunk_count
 
-    def retrieve_chunks(
+    @staticmethod
+    def _retrieval_key(
+        question: str,
+        dataset_ids: List[str],
+        document_ids: Optional[List[str]],
+        similarity_threshold: float,
+        vector_similarity_weight: float,
+        top_k: int,
+    ) -> Tuple:
+        return (
+            question,
+            tuple(sorted(dataset_ids)),
+            tuple(sorted(document_ids or [])),
+            similarity_threshold,
+            vector_similarity_weight,
+            top_k,
+        )
+
+    @staticmethod
+    async def _prefetch_pages(
+        fetch: Callable[[int], Awaitable[Tuple[List, int]]],
+    ) -> AsyncGenerator[List, None]:
+        page = 1
+        fetched = 0
+        pending = asyncio.create_task(fetch(page))
+        try:
+            while pending is not None:
+                batch, total = await pending
+                fetched += len(batch)
+                page += 1
+                pending = (
+                    asyncio.create_task(fetch(page))
+                    if batch and fetched < total
+                    else None
+                )
+                yield batch
+        finally:
+            if pending is not None:
+                pending.cancel()
+
+    async def export_chunks(
+        self,
+        dataset_id: str,
+        document_ids: Optional[List[str]] = None,
+        page_size: int = 100,
+    ) -> AsyncGenerator[Tuple[Document, Chunk], None]:
+        wanted = set(document_ids) if document_ids else None
+        documents = self._prefetch_pages(
+            lambda page: self.list_documents(dataset_id, page=page, page_size=page_size)
+        )
+        async for batch in documents:
+            for document in batch:
+                if wanted is not None and document.id not in wanted:
+                    continue
+                chunks = self._prefetch_pages(
+                    lambda page, document_id=document.id: self.list_chunks(
+                        dataset_id, document_id, page=page, page_size=page_size
+                    )
+                )
+                async for chunk_batch in chunks:
+                    for chunk in chunk_batch:
+                        yield document, chunk
+
+    async def retrieve_chunks(
         self,
         question: str,
         dataset_ids: List[str],
@@ -211,48 +332,180 @@ class RAGService:
         similarity_threshold: float = 0.2,
         vector_similarity_weight: float = 0.3,
         top_k: int = 1024,
-    ) -> List[ResultChunk]:
-        chunks = self._client.retrieve(
-            dataset_ids=dataset_ids,
-            question=question,
-            document_ids=document_ids,
-            page=page,
-            page_size=page_size,
-            similarity_threshold=similarity_threshold,
-            vector_similarity_weight=vector_similarity_weight,
-            top_k=top_k,
+    ) -> Tuple[List[ResultChunk], int]:
+        key = self._retrieval_key(
+            question,
+            dataset_ids,
+            document_ids,
+            similarity_threshold,
+            vector_similarity_weight,
+            top_k,
         )
-        return [
-            ResultChunk(
-                content=chunk["content"],
-                highlighted_content=chunk["highlight"],
-                id=chunk["id"],
-                similarity=chunk["similarity"],
-                term_similarity=chunk["term_similarity"],
-                vector_similarity=chunk["vector_similarity"],
+        snapshot = self._retrieval_cache.get(key)
+        if snapshot is None:
+            retrieval = await self._client.retrieve(
+                dataset_ids=dataset_ids,
+                question=question,
+                document_ids=document_ids,
+                page=1,
+                page_size=top_k,
+                similarity_threshold=similarity_threshold,
+                vector_similarity_weight=vector_similarity_weight,
+                top_k=top_k,
             )
-            for chunk in chunks
-        ]
+            snapshot = RetrievalSnapshot(retrieval.chunks)
+            self._retrieval_cache.put(key, snapshot)
+        return snapshot.page(page, page_size), len(snapshot)
+
+    async def _owns_document(self, dataset_id: str, document_id: str) -> bool:
+        owner = self._document_owners.get(document_id)
+        if owner is not None:
+            return owner == dataset_id
+        try:
+            documents, _ = await self._client.list_documents(
+                dataset_id, page_size=1, id=document_id
+            )
+        except RAGFlowError as e:
+            if e.client_error:
+                return False
+            raise
+        if documents:
+            self._document_owners.put(document_id, dataset_id)
+        return bool(documents)
+
+    async def _retrieve_shard(
+        self, dataset_id: str, document_ids: Optional[List[str]], **retrieval
+    ) -> Optional[RAGFlowRetrieval]:
+        if document_ids:
+            owned = await asyncio.gather(
+                *(
+                    self._owns_document(dataset_id, document_id)
+                    for document_id in document_ids
+                )
+            )
+            document_ids = [
+                document_id
+                for document_id, is_owned in zip(document_ids, owned)
+                if is_owned
+            ]
+            if not document_ids:
+                return None
+        return await self._client.retrieve(
+            dataset_ids=[dataset_id], document_ids=document_ids, **retrieval
+        )
+
+    async def retrieve_chunks_federated(
+        self,
+        question: str,
+        dataset_ids: List[str],
+        document_ids: Optional[List[str]] = None,
+        page: int = 1,
+        page_size: int = 30,
+        similarity_threshold: float = 0.2,
+        vector_similarity_weight: float = 0.3,
+        top_k: int = 1024,
+        dataset_timeout: Optional[float] = None,
+    ) -> Tuple[List[ResultChunk], int, List[str], List[str], List[str]]:
+        key = (
+            "federated",
+            *self._retrieval_key(
+                question,
+                dataset_ids,
+                document_ids,
+                similarity_threshold,
+                vector_similarity_weight,
+                top_k,
+            ),
+        )
+        snapshot = self._retrieval_cache.get(key)
+        if snapshot is not None:
+            return snapshot.page(page, page_size), len(snapshot), [], [], []
+
+        timeout = (
+            self._federated_timeout if dataset_timeout is None else dataset_timeout
+        )
+        unique_dataset_ids = list(dict.fromkeys(dataset_ids))
+        unique_document_ids = list(dict.fromkeys(document_ids or []))
+        results = await asyncio.gather(
+            *(
+                wait_for_upstream(
+                    self._retrieve_shard(
+                        dataset_id,
+                        unique_document_ids,
+                        question=question,
+                        page=1,
+                        page_size=top_k,
+                        similarity_threshold=similarity_threshold,
+                        vector_similarity_weight=vector_similarity_weight,
+                        top_k=top_k,
+                        timeout=timeout,
+                    ),
+                    timeout,
+                )
+                for dataset_id in unique_dataset_ids
+            ),
+            return_exceptions=True,
+        )
+
+        ranked_lists = []
+        queried_dataset_ids = []
+        timed_out_dataset_ids = []
+        failed_dataset_ids = []
+        for dataset_id, result in zip(unique_dataset_ids, results):
+            if result is None:
+                continue
+            queried_dataset_ids.append(dataset_id)
+            if isinstance(result, (asyncio.TimeoutError, RAGFlowTimeoutError)):
+                timed_out_dataset_ids.append(dataset_id)
+            elif isinstance(result, BaseException):
+                failed_dataset_ids.append(dataset_id)
+            else:
+                ranked_lists.append(result.chunks)
+
+        snapshot = RetrievalSnapshot(
+            islice(
+                heapq.merge(*ranked_lists, key=lambda chunk: -chunk.similarity),
+                top_k,
+            )
+        )
+        if not timed_out_dataset_ids and not failed_dataset_ids:
+            self._retrieval_cache.put(key, snapshot)
+        return (
+            snapshot.page(page, page_size),
+            len(snapshot),
+            timed_out_dataset_ids,
+            failed_dataset_ids,
+            queried_dataset_ids,
+        )
 
-    def create_conversation(self, chat_id: str, user_id: str, conversation_id: str):
-        chat = self._client.list_chats(id=chat_id)[0]
-        chat.create_session(name=f"{user_id}:{conversation_id}")
+    async def create_conversation(
+        self, chat_id: str, user_id: str, conversation_id: str
+    ):
+        await self._client.create_session(
+            chat_id, name=f"{user_id}:{conversation_id}"
+        )
 
-    def get_conversation(
+    async def get_conversation(
         self, chat_id: str, user_id: str, conversation_id: str
-    ) -> Optional[Session]:
-        chat = self._client.list_chats(id=chat_id)[0]
-        return chat.list_sessions(name=f"{user_id}:{conversation_id}")[0]
+    ) -> Optional[RAGFlowSession]:
+        sessions = await self._client.list_sessions(
+            chat_id, name=f"{user_id}:{conversation_id}"
+        )
+        return sessions[0] if sessions else None
 
-    def delete_conversation(self, chat_id: str, user_id: str, conversation_id: str):
-        chat = self._client.list_chats(id=chat_id)[0]
-        session = chat.list_sessions(name=f"{user_id}:{conversation_id}")[0]
-        chat.delete_sessions(ids=[session.id])
+    async def delete_conversation(
+        self, chat_id: str, user_id: str, conversation_id: str
+    ):
+        session = await self.get_conversation(chat_id, user_id, conversation_id)
+        if session is not None:
+            await self._client.delete_sessions(chat_id, ids=[session.id])
 
-    def get_conversation_messages(
+    async def get_conversation_messages(
         self, chat_id: str, user_id: str, conversation_id: str
     ) -> List[Message]:
-        session = self.get_conversation(chat_id, user_id, conversation_id)
+        session = await self.get_conversation(chat_id, user_id, conversation_id)
+        if session is None:
+            return []
         messages = session.messages
         for message in messages:
             if "reference" not in message:
@@ -284,20 +537,20 @@ class RAGService:
             for message in messages
         ]
 
-    def chat(
+    async def chat(
         self, chat_id: str, user_id: str, conversation_id: str, message: str
-    ) -> Tuple[Generator[str, None, None], List[ReferenceChunk], List[str]]:
-        chat = self._client.list_chats(id=chat_id)[0]
-        session = chat.list_sessions(name=f"{user_id}:{conversation_id}")[0]
-        result = session.ask(question=message, stream=True)
+    ) -> Tuple[AsyncGenerator[str, None], List[ReferenceChunk], List[str]]:
+        session = await self.get_conversation(chat_id, user_id, conversation_id)
+        if session is None:
+            raise Exception("Conversation session not found")
+        result = self._client.ask(chat_id, session_id=session.id, question=message)
 
         complete_message = [""]
         references: List[ReferenceChunk] = []
 
-        def message_generator():
-            for content in result:
-                nonlocal complete_message, references
-                current_message = content.content
+        async def message_generator():
+            async for content in result:
+                current_message = content.answer
 
                 if content.reference:
                     new_references, new_message = self.extract_filter_and_reorder(
@@ -325,7 +578,7 @@ class RAGService:
         return generator, references, complete_message
 
 
-if __name__ == "__main__":
+async def main():
     load_dotenv()
     rag_service = RAGService(
         token=os.getenv("RAG_TOKEN"),
@@ -334,22 +587,24 @@ if __name__ == "__main__":
 
     ### Example usage
     """
-    datasets = rag_service.list_datasets()
+    datasets = await rag_service.list_datasets()
     print(f"Datasets: {[dataset.name for dataset in datasets]}")
 
     dataset = datasets[1]
     pages = rag_service.calculate_page_count(dataset.document_count, 10)
     print(f"Total pages: {pages}")
 
-    documents = rag_service.list_documents(dataset.id, page=2, page_size=10)
+    documents, _ = await rag_service.list_documents(dataset.id, page=2, page_size=10)
     print(f"Documents in page 2: {[document.name for document in documents]}")
 
     document = documents[0]
-    chunks = rag_service.list_chunks(dataset.id, document.id, page=1, page_size=10)
+    chunks, _ = await rag_service.list_chunks(
+        dataset.id, document.id, page=1, page_size=10
+    )
     print(f"Chunks in document {document.name}: {[chunk.content for chunk in chunks]}")
 
-    chunk_results = rag_service.retrieve_chunks(
-        "勾股定理", [dataset.id for dataset in rag_service.list_datasets()]
+    chunk_results, chunk_count = await rag_service.retrieve_chunks(
+        "勾股定理", [dataset.id for dataset in await rag_service.list_datasets()]
     )
     for chunk in chunk_results:
         print(f"Content: {chunk.content}")
@@ -360,7 +615,7 @@ if __name__ == "__main__":
         print(f"Vector Similarity: {chunk.vector_similarity}")
         print("-" * 40)
 
-    messages = rag_service.get_conversation_messages(
+    messages = await rag_service.get_conversation_messages(
         os.getenv("RAG_CHAT_ID"),
         user_id="user_id",
         conversation_id="conversation_id",
@@ -372,14 +627,14 @@ if __name__ == "__main__":
         print("-" * 40)
     """
 
-    generator, references, complete_message = rag_service.chat(
+    generator, references, complete_message = await rag_service.chat(
         os.getenv("RAG_CHAT_ID"),
         user_id="user_id",
         conversation_id="conversation_id",
         message="介绍一下勾股定理",
     )
 
-    for delta_message in generator:
+    async for delta_message in generator:
         print(delta_message, end="", flush=True)
 
     print()
@@ -388,3 +643,9 @@ if __name__ == "__main__":
     print("-" * 40)
     print(f"References: {[reference.document_name for reference in references]}")
     print("-" * 40)
+
+    await rag_service.aclose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,373 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple
+
+import httpx
+
+try:
+    import h2  # noqa: F401
+
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+from services.metrics import timed
+
+
+RAGFLOW_CLIENT_ERROR_CODES = {101, 102, 109}
+
+
+class RAGFlowError(Exception):
+    def __init__(self, message: str, code: Optional[int] = None):
+        super().__init__(message)
+        self.code = code
+
+    @property
+    def client_error(self) -> bool:
+        return self.code in RAGFLOW_CLIENT_ERROR_CODES
+
+
+class RAGFlowTimeoutError(RAGFlowError):
+    pass
+
+
+@dataclass
+class RAGFlowDataset:
+    id: str
+    name: str
+    document_count: int
+    chunk_count: int
+
+
+@dataclass
+class RAGFlowDocument:
+    id: str
+    name: str
+    size: int
+    token_count: int
+    chunk_count: int
+    progress: float
+    progress_msg: str
+    run: str
+    update_time: Optional[int] = None
+
+
+@dataclass
+class RAGFlowChunk:
+    id: str
+    content: str
+    available: bool
+    document_id: str
+
+
+@dataclass
+class RAGFlowRetrievedChunk:
+    id: str
+    content: str
+    highlight: str
+    similarity: float
+    term_similarity: float
+    vector_similarity: float
+    document_id: str
+    dataset_id: str
+
+
+@dataclass
+class RAGFlowRetrieval:
+    chunks: List[RAGFlowRetrievedChunk]
+    total: int
+
+
+@dataclass
+class RAGFlowChat:
+    id: str
+    name: str
+
+
+@dataclass
+class RAGFlowSession:
+    id: str
+    name: str
+    chat_id: str
+    messages: List[Dict[str, Any]] = field(default_factory=list)
+
+
+@dataclass
+class RAGFlowCompletion:
+    answer: str
+    reference: List[Dict[str, Any]]
+    session_id: Optional[str] = None
+
+
+class RAGFlowClient:
+    def __init__(
+        self,
+        token: str,
+        endpoint: str,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30,
+        timeout: float = 30,
+        stream_timeout: float = 300,
+        http2: bool = True,
+    ):
+        self._endpoint = endpoint.rstrip("/")
+        self._stream_timeout = httpx.Timeout(timeout, read=stream_timeout)
+        self._client = httpx.AsyncClient(
+            base_url=f"{self._endpoint}/api/v1",
+            headers={"Authorization": f"Bearer {token}"},
+            http2=http2 and HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_keepalive_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(timeout),
+        )
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    @staticmethod
+    def _unwrap(response: httpx.Response) -> Any:
+        try:
+            payload = response.json()
+        except ValueError:
+            raise RAGFlowError(
+                f"Unexpected response from RAGFlow (HTTP {response.status_code})"
+            )
+        if payload.get("code") != 0:
+            raise RAGFlowError(
+                payload.get("message") or "RAGFlow request failed", payload.get("code")
+            )
+        return payload.get("data")
+
+    async def _request(self, method: str, path: str, **kwargs) -> Any:
+        try:
+            response = await self._client.request(method, path, **kwargs)
+        except httpx.TimeoutException as e:
+            raise RAGFlowTimeoutError(f"RAGFlow request timed out: {e}") from e
+        except httpx.HTTPError as e:
+            raise RAGFlowError(f"RAGFlow request failed: {e}") from e
+        return self._unwrap(response)
+
+    @staticmethod
+    def _params(**params) -> Dict[str, Any]:
+        return {key: value for key, value in params.items() if value is not None}
+
+    @timed("ragflow")
+    async def list_datasets(
+        self,
+        page: int = 1,
+        page_size: int = 30,
+        id: Optional[str] = None,
+        name: Optional[str] = None,
+    ) -> List[RAGFlowDataset]:
+        data = await self._request(
+            "GET",
+            "/datasets",
+            params=self._params(page=page, page_size=page_size, id=id, name=name),
+        )
+        return [
+            RAGFlowDataset(
+                id=dataset["id"],
+                name=dataset["name"],
+                document_count=dataset.get("document_count", 0),
+                chunk_count=dataset.get("chunk_count", 0),
+            )
+            for dataset in data or []
+        ]
+
+    @timed("ragflow")
+    async def list_documents(
+        self,
+        dataset_id: str,
+        page: int = 1,
+        page_size: int = 30,
+        id: Optional[str] = None,
+    ) -> Tuple[List[RAGFlowDocument], int]:
+        data = await self._request(
+            "GET",
+            f"/datasets/{dataset_id}/documents",
+            params=self._params(page=page, page_size=page_size, id=id),
+        )
+        return [
+            RAGFlowDocument(
+                id=document["id"],
+                name=document["name"],
+                size=document.get("size", 0),
+                token_count=document.get("token_count", 0),
+                chunk_count=document.get("chunk_count", 0),
+                progress=document.get("progress", 0.0),
+                progress_msg=document.get("progress_msg", ""),
+                run=document.get("run", ""),
+                update_time=document.get("update_time"),
+            )
+            for document in data.get("docs", [])
+        ], data.get("total", 0)
+
+    @timed("ragflow")
+    async def list_chunks(
+        self,
+        dataset_id: str,
+        document_id: str,
+        page: int = 1,
+        page_size: int = 30,
+    ) -> Tuple[List[RAGFlowChunk], int]:
+        data = await self._request(
+            "GET",
+            f"/datasets/{dataset_id}/documents/{document_id}/chunks",
+            params=self._params(page=page, page_size=page_size),
+        )
+        return [
+            RAGFlowChunk(
+                id=chunk["id"],
+                content=chunk.get("content", ""),
+                available=chunk.get("available", True),
+                document_id=chunk.get("document_id", document_id),
+            )
+            for chunk in data.get("chunks", [])
+        ], data.get("total", 0)
+
+    @timed("ragflow")
+    async def retrieve(
+        self,
+        dataset_ids: List[str],
+        question: str,
+        document_ids: Optional[List[str]] = None,
+        page: int = 1,
+        page_size: int = 30,
+        similarity_threshold: float = 0.2,
+        vector_similarity_weight: float = 0.3,
+        top_k: int = 1024,
+        rerank_id: Optional[str] = None,
+        keyword: bool = False,
+        timeout: Optional[float] = None,
+    ) -> RAGFlowRetrieval:
+        data = await self._request(
+            "POST",
+            "/retrieval",
+            json={
+                "page": page,
+                "page_size": page_size,
+                "similarity_threshold": similarity_threshold,
+                "vector_similarity_weight": vector_similarity_weight,
+                "top_k": top_k,
+                "rerank_id": rerank_id,
+                "keyword": keyword,
+                "question": question,
+                "dataset_ids": dataset_ids,
+                "document_ids": document_ids or [],
+            },
+            timeout=timeout if timeout is not None else httpx.USE_CLIENT_DEFAULT,
+        )
+        return RAGFlowRetrieval(
+            chunks=[
+                RAGFlowRetrievedChunk(
+                    id=chunk["id"],
+                    content=chunk["content"],
+                    highlight=chunk.get("highlight") or chunk["content"],
+                    similarity=chunk["similarity"],
+                    term_similarity=chunk["term_similarity"],
+                    vector_similarity=chunk["vector_similarity"],
+                    document_id=chunk.get("document_id", ""),
+                    dataset_id=chunk.get("kb_id", ""),
+                )
+                for chunk in data.get("chunks", [])
+            ],
+            total=data.get("total", 0),
+        )
+
+    @timed("ragflow")
+    async def list_chats(
+        self, id: Optional[str] = None, name: Optional[str] = None
+    ) -> List[RAGFlowChat]:
+        data = await self._request(
+            "GET", "/chats", params=self._params(id=id, name=name)
+        )
+        return [RAGFlowChat(id=chat["id"], name=chat["name"]) for chat in data or []]
+
+    @staticmethod
+    def _session(chat_id: str, session: Dict[str, Any]) -> RAGFlowSession:
+        return RAGFlowSession(
+            id=session["id"],
+            name=session["name"],
+            chat_id=session.get("chat_id", chat_id),
+            messages=session.get("messages") or [],
+        )
+
+    @timed("ragflow")
+    async def create_session(self, chat_id: str, name: str) -> RAGFlowSession:
+        data = await self._request(
+            "POST", f"/chats/{chat_id}/sessions", json={"name": name}
+        )
+        return self._session(chat_id, data)
+
+    @timed("ragflow")
+    async def list_sessions(
+        self,
+        chat_id: str,
+        name: Optional[str] = None,
+        id: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 30,
+    ) -> List[RAGFlowSession]:
+        data = await self._request(
+            "GET",
+            f"/chats/{chat_id}/sessions",
+            params=self._params(page=page, page_size=page_size, name=name, id=id),
+        )
+        return [self._session(chat_id, session) for session in data or []]
+
+    @timed("ragflow")
+    async def delete_sessions(self, chat_id: str, ids: List[str]):
+        await self._request("DELETE", f"/chats/{chat_id}/sessions", json={"ids": ids})
+
+    @timed("ragflow")
+    async def ask(
+        self, chat_id: str, session_id: str, question: str
+    ) -> AsyncGenerator[RAGFlowCompletion, None]:
+        async with self._client.stream(
+            "POST",
+            f"/chats/{chat_id}/completions",
+            json={"question": question, "stream": True, "session_id": session_id},
+            timeout=self._stream_timeout,
+        ) as response:
+            async for line in response.aiter_lines():
+                if line.startswith("{"):
+                    raise RAGFlowError(json.loads(line).get("message"))
+                if not line.startswith("data:"):
+                    continue
+                payload = json.loads(line[5:])
+                if payload.get("code", 0) != 0:
+                    raise RAGFlowError(payload.get("message"), payload.get("code"))
+                data = payload.get("data")
+                if data is True or not isinstance(data, dict):
+                    continue
+                if data.get("running_status"):
+                    continue
+                reference = data.get("reference")
+                yield RAGFlowCompletion(
+                    answer=data.get("answer", ""),
+                    reference=(
+                        reference.get("chunks", [])
+                        if isinstance(reference, dict)
+                        else []
+                    ),
+                    session_id=data.get("session_id", session_id),
+                )
+
+    @timed("ragflow", guarded=False)
+    async def get_system_status(self, authorization: str) -> Optional[Dict]:
+        try:
+            response = await self._client.get(
+                f"{self._endpoint}/v1/system/status",
+                headers={"Authorization": authorization},
+            )
+        except httpx.TimeoutException as e:
+            raise RAGFlowTimeoutError(f"RAGFlow request timed out: {e}") from e
+        except httpx.HTTPError as e:
+            raise RAGFlowError(f"RAGFlow request failed: {e}") from e
+        if response.status_code != 200:
+            return None
+        return response.json().get("data")
@@ -0,0 +1,237 @@
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Optional
+
+from services.cache import LRUCache
+
+try:
+    import redis.asyncio as redis
+
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+class RateLimitBackend(ABC):
+    @abstractmethod
+    async def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        pass
+
+    @abstractmethod
+    async def add_failure(self, key: str, ttl: float) -> int:
+        pass
+
+    @abstractmethod
+    async def block(self, key: str, duration: float):
+        pass
+
+    @abstractmethod
+    async def blocked_for(self, key: str) -> float:
+        pass
+
+    @abstractmethod
+    async def reset(self, key: str):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+@dataclass
+class TokenBucket:
+    tokens: float
+    updated_at: float
+
+
+@dataclass
+class FailureState:
+    failures: int = 0
+    expires_at: float = 0.0
+    blocked_until: float = 0.0
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    def __init__(self, max_entries: int = 100000):
+        self._buckets: LRUCache[TokenBucket] = LRUCache(max_entries=max_entries)
+        self._failures: LRUCache[FailureState] = LRUCache(max_entries=max_entries)
+
+    async def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        now = time.monotonic()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(tokens=capacity, updated_at=now)
+            self._buckets.put(key, bucket)
+        bucket.tokens = min(
+            capacity, bucket.tokens + (now - bucket.updated_at) * refill_rate
+        )
+        bucket.updated_at = now
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / refill_rate
+
+    def _state(self, key: str) -> Optional[FailureState]:
+        state = self._failures.get(key)
+        if state is None:
+            return None
+        now = time.monotonic()
+        if state.expires_at <= now and state.blocked_until <= now:
+            self._failures.invalidate(key)
+            return None
+        return state
+
+    async def add_failure(self, key: str, ttl: float) -> int:
+        state = self._state(key)
+        if state is None:
+            state = FailureState()
+            self._failures.put(key, state)
+        state.failures += 1
+        state.expires_at = time.monotonic() + ttl
+        return state.failures
+
+    async def block(self, key: str, duration: float):
+        state = self._state(key)
+        if state is None:
+            state = FailureState()
+            self._failures.put(key, state)
+        state.blocked_until = time.monotonic() + duration
+
+    async def blocked_for(self, key: str) -> float:
+        state = self._state(key)
+        if state is None:
+            return 0.0
+        return max(0.0, state.blocked_until - time.monotonic())
+
+    async def reset(self, key: str):
+        self._failures.invalidate(key)
+
+
+TAKE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local refill_rate = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(redis.call('HGET', KEYS[1], 'tokens'))
+local updated_at = tonumber(redis.call('HGET', KEYS[1], 'updated_at'))
+if tokens == nil or updated_at == nil then
+    tokens = capacity
+    updated_at = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - updated_at) * refill_rate)
+local retry_after = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry_after = (1 - tokens) / refill_rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated_at', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / refill_rate) + 1)
+return tostring(retry_after)
+"""
+
+FAILURE_SCRIPT = """
+local failures = redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return failures
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("redis package is required for RedisRateLimitBackend")
+        self._redis = redis.from_url(url)
+        self._prefix = prefix
+        self._take = self._redis.register_script(TAKE_SCRIPT)
+        self._add_failure = self._redis.register_script(FAILURE_SCRIPT)
+
+    async def aclose(self):
+        await self._redis.aclose()
+
+    async def take(self, key: str, capacity: float, refill_rate: float) -> float:
+        retry_after = await self._take(
+            keys=[f"{self._prefix}bucket:{key}"],
+            args=[capacity, refill_rate, time.time()],
+        )
+        return float(retry_after)
+
+    async def add_failure(self, key: str, ttl: float) -> int:
+        return int(
+            await self._add_failure(
+                keys=[f"{self._prefix}failures:{key}"], args=[math.ceil(ttl)]
+            )
+        )
+
+    async def block(self, key: str, duration: float):
+        await self._redis.set(
+            f"{self._prefix}blocked:{key}", 1, px=max(1, int(duration * 1000))
+        )
+
+    async def blocked_for(self, key: str) -> float:
+        ttl = await self._redis.pttl(f"{self._prefix}blocked:{key}")
+        return max(0.0, ttl / 1000)
+
+    async def reset(self, key: str):
+        await self._redis.delete(
+            f"{self._prefix}failures:{key}", f"{self._prefix}blocked:{key}"
+        )
+
+
+class LoginThrottle:
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        ip_capacity: float = 20,
+        ip_refill_rate: float = 20 / 60,
+        email_capacity: float = 5,
+        email_refill_rate: float = 5 / 60,
+        backoff_after: int = 3,
+        backoff_base: float = 1,
+        backoff_max: float = 300,
+        failure_ttl: float = 900,
+    ):
+        self._backend = backend
+        self._ip_capacity = ip_capacity
+        self._ip_refill_rate = ip_refill_rate
+        self._email_capacity = email_capacity
+        self._email_refill_rate = email_refill_rate
+        self._backoff_after = backoff_after
+        self._backoff_base = backoff_base
+        self._backoff_max = backoff_max
+        self._failure_ttl = failure_ttl
+
+    async def aclose(self):
+        await self._backend.aclose()
+
+    @staticmethod
+    def _email_key(email: str) -> str:
+        return f"login:email:{email.strip().lower()}"
+
+    async def check(self, ip: Optional[str], email: str) -> float:
+        email_key = self._email_key(email)
+        blocked_for = await self._backend.blocked_for(email_key)
+        if blocked_for > 0:
+            return blocked_for
+        if ip:
+            retry_after = await self._backend.take(
+                f"login:ip:{ip}", self._ip_capacity, self._ip_refill_rate
+            )
+            if retry_after > 0:
+                return retry_after
+        return await self._backend.take(
+            email_key, self._email_capacity, self._email_refill_rate
+        )
+
+    async def record_failure(self, email: str) -> float:
+        email_key = self._email_key(email)
+        failures = await self._backend.add_failure(email_key, self._failure_ttl)
+        if failures <= self._backoff_after:
+            return 0.0
+        exponent = min(failures - self._backoff_after - 1, 32)
+        delay = min(self._backoff_max, self._backoff_base * 2**exponent)
+        await self._backend.block(email_key, delay)
+        return delay
+
+    async def record_success(self, email: str):
+        await self._backend.reset(self._email_key(email))
@@ -0,0 +1,410 @@
+import asyncio
+import contextvars
+import json
+import os
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+import httpx
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+
+@dataclass
+class Span:
+    span_id: str
+    parent_id: Optional[str]
+    name: str
+    kind: str
+    start: float
+    duration: Optional[float] = None
+    error: Optional[str] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+
+
+@dataclass
+class Trace:
+    trace_id: str
+    name: str
+    start: float
+    root: Span
+    duration: Optional[float] = None
+    status: Optional[int] = None
+    spans: List[Span] = field(default_factory=list)
+    dropped_spans: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+current_trace: contextvars.ContextVar[Optional[Trace]] = contextvars.ContextVar(
+    "current_trace", default=None
+)
+current_span: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar(
+    "current_span", default=None
+)
+
+
+def _span_id() -> str:
+    return os.urandom(8).hex()
+
+
+def parse_traceparent(header: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    parts = (header or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None, None
+    try:
+        int(parts[1], 16)
+        int(parts[2], 16)
+    except ValueError:
+        return None, None
+    return parts[1], parts[2]
+
+
+class TraceExporter(ABC):
+    @abstractmethod
+    async def export(self, traces: List[Trace]):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+class JsonlTraceExporter(TraceExporter):
+    def __init__(self, path: str):
+        self._path = path
+
+    def _write(self, traces: List[Trace]):
+        with open(self._path, "a", encoding="utf-8") as f:
+            for trace in traces:
+                f.write(json.dumps(trace.to_dict(), ensure_ascii=False, default=str))
+                f.write("\n")
+
+    async def export(self, traces: List[Trace]):
+        await asyncio.to_thread(self._write, traces)
+
+
+OTLP_SPAN_KINDS = {"server": 2, "upstream": 3, "db": 3}
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(trace: Trace, span: Span) -> Dict[str, Any]:
+    start = int(span.start * 1e9)
+    result = {
+        "traceId": trace.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": OTLP_SPAN_KINDS.get(span.kind, 1),
+        "startTimeUnixNano": str(start),
+        "endTimeUnixNano": str(start + int((span.duration or 0) * 1e9)),
+        "attributes": [
+            {"key": key, "value": _otlp_value(value)}
+            for key, value in span.attributes.items()
+            if value is not None
+        ],
+        "status": (
+            {"code": 2, "message": span.error} if span.error else {"code": 1}
+        ),
+    }
+    if span.parent_id:
+        result["parentSpanId"] = span.parent_id
+    return result
+
+
+class OtlpTraceExporter(TraceExporter):
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5):
+        self._endpoint = endpoint
+        self._service_name = service_name
+        self._client = httpx.AsyncClient(timeout=httpx.Timeout(timeout))
+
+    async def export(self, traces: List[Trace]):
+        spans = [
+            _otlp_span(trace, span)
+            for trace in traces
+            for span in [trace.root, *trace.spans]
+        ]
+        response = await self._client.post(
+            self._endpoint,
+            json={
+                "resourceSpans": [
+                    {
+                        "resource": {
+                            "attributes": [
+                                {
+                                    "key": "service.name",
+                                    "value": {"stringValue": self._service_name},
+                                }
+                            ]
+                        },
+                        "scopeSpans": [
+                            {"scope": {"name": self._service_name}, "spans": spans}
+                        ],
+                    }
+                ]
+            },
+        )
+        response.raise_for_status()
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+class Tracer:
+    def __init__(
+        self,
+        enabled: bool = True,
+        recent_traces: int = 500,
+        max_spans: int = 500,
+        export_interval: float = 5,
+        export_queue: int = 10000,
+        exporters: Optional[List[TraceExporter]] = None,
+    ):
+        self.enabled = enabled
+        self._recent: Deque[Trace] = deque(maxlen=recent_traces)
+        self._max_spans = max_spans
+        self._export_interval = export_interval
+        self._pending: Deque[Trace] = deque(maxlen=export_queue)
+        self._exporters = exporters or []
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._exporters and self._export_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.export()
+        for exporter in self._exporters:
+            await exporter.aclose()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self._export_interval)
+            await self.export()
+
+    async def export(self):
+        if not self._pending:
+            return
+        traces = list(self._pending)
+        self._pending.clear()
+        for exporter in self._exporters:
+            try:
+                await exporter.export(traces)
+            except Exception as e:
+                print(f"Trace export failed: {e}", flush=True)
+
+    def start_trace(
+        self, name: str, traceparent: Optional[str] = None, **attributes
+    ) -> Optional[Tuple[Trace, contextvars.Token, contextvars.Token]]:
+        if not self.enabled:
+            return None
+        trace_id, parent_id = parse_traceparent(traceparent)
+        now = time.time()
+        root = Span(
+            span_id=_span_id(),
+            parent_id=parent_id,
+            name=name,
+            kind="server",
+            start=now,
+            attributes=attributes,
+        )
+        trace = Trace(
+            trace_id=trace_id or uuid.uuid4().hex, name=name, start=now, root=root
+        )
+        return trace, current_trace.set(trace), current_span.set(root)
+
+    def finish_trace(
+        self,
+        handle: Optional[Tuple[Trace, contextvars.Token, contextvars.Token]],
+        status: Optional[int] = None,
+        name: Optional[str] = None,
+    ):
+        if handle is None:
+            return
+        trace, trace_token, span_token = handle
+        current_span.reset(span_token)
+        current_trace.reset(trace_token)
+        trace.duration = time.time() - trace.start
+        trace.root.duration = trace.duration
+        trace.status = status
+        if name:
+            trace.name = trace.root.name = name
+        if status is not None:
+            trace.root.attributes["http.status_code"] = status
+            if status >= 500:
+                trace.root.error = f"HTTP {status}"
+        self._recent.append(trace)
+        if self._exporters:
+            self._pending.append(trace)
+
+    def begin_span(
+        self, name: str, kind: str = "internal", activate: bool = True, **attributes
+    ) -> Optional[Tuple[Span, Optional[contextvars.Token]]]:
+        trace = current_trace.get()
+        if trace is None:
+            return None
+        if len(trace.spans) >= self._max_spans:
+            trace.dropped_spans += 1
+            return None
+        parent = current_span.get()
+        span = Span(
+            span_id=_span_id(),
+            parent_id=parent.span_id if parent else None,
+            name=name,
+            kind=kind,
+            start=time.time(),
+            attributes=attributes,
+        )
+        trace.spans.append(span)
+        return span, current_span.set(span) if activate else None
+
+    def end_span(
+        self,
+        handle: Optional[Tuple[Span, Optional[contextvars.Token]]],
+        error: Optional[BaseException] = None,
+    ):
+        if handle is None:
+            return
+        span, token = handle
+        span.duration = time.time() - span.start
+        if error is not None:
+            span.error = str(error) or type(error).__name__
+        if token is not None:
+            try:
+                current_span.reset(token)
+            except ValueError:
+                pass
+
+    @contextmanager
+    def span(
+        self, name: str, kind: str = "internal", **attributes
+    ) -> Iterator[Optional[Span]]:
+        handle = self.begin_span(name, kind, **attributes)
+        try:
+            yield handle[0] if handle else None
+        except BaseException as e:
+            self.end_span(handle, e)
+            raise
+        self.end_span(handle)
+
+    def annotate(self, **attributes):
+        trace = current_trace.get()
+        if trace is not None:
+            trace.root.attributes.update(attributes)
+
+    def recent(self) -> List[Trace]:
+        return list(self._recent)
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        for trace in reversed(self._recent):
+            if trace.trace_id == trace_id:
+                return trace
+        return None
+
+    def slowest(self, limit: int, min_duration: float = 0) -> List[Trace]:
+        traces = [
+            trace
+            for trace in self._recent
+            if trace.duration is not None and trace.duration >= min_duration
+        ]
+        return sorted(traces, key=lambda trace: trace.duration, reverse=True)[:limit]
+
+
+def _statement_name(statement: str) -> str:
+    keyword = statement.lstrip().split(None, 1)
+    return f"db.{keyword[0].lower()}" if keyword else "db.query"
+
+
+def instrument_sqlalchemy(tracer: Tracer, statement_length: int = 500):
+    @event.listens_for(Engine, "before_cursor_execute")
+    def before_cursor_execute(
+        connection, cursor, statement, parameters, context, executemany
+    ):
+        if context is not None:
+            context._trace_span = tracer.begin_span(
+                _statement_name(statement),
+                "db",
+                statement=" ".join(statement.split())[:statement_length],
+                database=connection.engine.url.database,
+            )
+
+    @event.listens_for(Engine, "after_cursor_execute")
+    def after_cursor_execute(
+        connection, cursor, statement, parameters, context, executemany
+    ):
+        handle = getattr(context, "_trace_span", None)
+        if handle is not None:
+            handle[0].attributes["rows"] = cursor.rowcount
+            tracer.end_span(handle)
+            context._trace_span = None
+
+    @event.listens_for(Engine, "handle_error")
+    def handle_error(exception_context):
+        context = exception_context.execution_context
+        handle = getattr(context, "_trace_span", None)
+        if handle is not None:
+            tracer.end_span(handle, exception_context.original_exception)
+            context._trace_span = None
+
+    @event.listens_for(Session, "before_commit")
+    def before_commit(session):
+        session.info["trace_commit_span"] = tracer.begin_span("db.commit", "db")
+
+    @event.listens_for(Session, "after_commit")
+    def after_commit(session):
+        tracer.end_span(session.info.pop("trace_commit_span", None))
+
+    @event.listens_for(Session, "after_rollback")
+    def after_rollback(session):
+        handle = session.info.pop("trace_commit_span", None)
+        if handle is not None:
+            tracer.end_span(handle, RuntimeError("rolled back"))
+
+
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")
+OTLP_TRACES_ENDPOINT = os.getenv("OTLP_TRACES_ENDPOINT")
+
+tracer = Tracer(
+    enabled=os.getenv("TRACING_ENABLED", "true").lower() == "true",
+    recent_traces=int(os.getenv("TRACE_RECENT_SIZE", "500")),
+    max_spans=int(os.getenv("TRACE_MAX_SPANS", "500")),
+    export_interval=float(os.getenv("TRACE_EXPORT_INTERVAL", "5")),
+    exporters=[
+        exporter
+        for exporter in (
+            JsonlTraceExporter(TRACE_EXPORT_PATH) if TRACE_EXPORT_PATH else None,
+            (
+                OtlpTraceExporter(
+                    OTLP_TRACES_ENDPOINT,
+                    service_name=os.getenv("OTEL_SERVICE_NAME", "backend"),
+                )
+                if OTLP_TRACES_ENDPOINT
+                else None
+            ),
+        )
+        if exporter is not None
+    ],
+)
+if tracer.enabled:
+    instrument_sqlalchemy(tracer)
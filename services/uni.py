@@ -1,10 +1,27 @@
+import asyncio
 import os
 
 from dotenv import load_dotenv
+from sqlalchemy import text
 
+from db.database import AsyncSessionLocal, replica_router
+from services.graph_service import GraphService
+from services.health_monitor import HealthMonitor
+from services.ingestion_monitor import IngestionMonitor
+from services.knowledge_mirror import KnowledgeMirror
 from services.llm_service import LLMService
+from services.metrics import EventLoopLagMonitor
 from services.ocr_service import OCRService
+from services.password_service import PasswordService
+from services.profiling import LoopWatchdog
+from services.rate_limiter import (
+    LoginThrottle,
+    MemoryRateLimitBackend,
+    RedisRateLimitBackend,
+)
 from services.rag_service import RAGService
+from services.usage_counter import UsageCounter
+from services.usage_events import UsageEventLog
 
 load_dotenv()
 
@@ -19,6 +36,25 @@ if not RAG_TOKEN or not RAG_ENDPOINT or not RAG_CHAT_ID or not RAG_AUTHORIZATION
 rag_service = RAGService(
     token=RAG_TOKEN,
     endpoint=RAG_ENDPOINT,
+    retrieval_cache_entries=int(os.getenv("RAG_RETRIEVAL_CACHE_ENTRIES", "256")),
+    retrieval_cache_chunks=int(os.getenv("RAG_RETRIEVAL_CACHE_CHUNKS", "65536")),
+    retrieval_cache_ttl=float(os.getenv("RAG_RETRIEVAL_CACHE_TTL", "300")),
+    max_connections=int(os.getenv("RAG_MAX_CONNECTIONS", "100")),
+    max_keepalive_connections=int(os.getenv("RAG_MAX_KEEPALIVE_CONNECTIONS", "20")),
+    keepalive_expiry=float(os.getenv("RAG_KEEPALIVE_EXPIRY", "30")),
+    timeout=float(os.getenv("RAG_TIMEOUT", "30")),
+    stream_timeout=float(os.getenv("RAG_STREAM_TIMEOUT", "300")),
+    http2=os.getenv("RAG_HTTP2", "true").lower() == "true",
+    federated_timeout=float(os.getenv("RAG_FEDERATED_TIMEOUT", "10")),
+)
+knowledge_mirror = KnowledgeMirror(
+    rag_service=rag_service,
+    path=os.getenv("KNOWLEDGE_MIRROR_PATH", "knowledge_mirror.db"),
+    sync_interval=float(os.getenv("KNOWLEDGE_MIRROR_SYNC_INTERVAL", "600")),
+)
+ingestion_monitor = IngestionMonitor(
+    rag_service=rag_service,
+    poll_interval=float(os.getenv("RAG_INGESTION_POLL_INTERVAL", "3")),
 )
 
 LLM_TOKEN = os.getenv("LLM_TOKEN")
@@ -42,3 +78,86 @@ ocr_service = OCRService(OCR_TOKEN, OCR_ENDPOINT)
 LIGHT_GRAPH_ENDPOINT = os.getenv("LIGHT_GRAPH_ENDPOINT")
 if not LIGHT_GRAPH_ENDPOINT:
     raise RuntimeError("LIGHT_GRAPH_ENDPOINT environment variable not set")
+graph_service = GraphService(
+    endpoint=LIGHT_GRAPH_ENDPOINT,
+    cache_ttl=float(os.getenv("LIGHT_GRAPH_CACHE_TTL", "60")),
+    cache_entries=int(os.getenv("LIGHT_GRAPH_CACHE_ENTRIES", "128")),
+    max_connections=int(os.getenv("LIGHT_GRAPH_MAX_CONNECTIONS", "20")),
+    timeout=float(os.getenv("LIGHT_GRAPH_TIMEOUT", "30")),
+    index_refresh_interval=float(os.getenv("LIGHT_GRAPH_INDEX_REFRESH", "300")),
+    index_max_nodes=int(os.getenv("LIGHT_GRAPH_INDEX_MAX_NODES", "100000")),
+    layout_max_nodes=int(os.getenv("LIGHT_GRAPH_LAYOUT_MAX_NODES", "2000")),
+)
+
+password_service = PasswordService(
+    workers=int(os.getenv("PASSWORD_HASH_WORKERS", "2")),
+    max_pending=int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64")),
+    rounds=int(os.getenv("BCRYPT_ROUNDS", "12")),
+)
+
+LOGIN_THROTTLE_REDIS_URL = os.getenv("LOGIN_THROTTLE_REDIS_URL")
+login_throttle = LoginThrottle(
+    (
+        RedisRateLimitBackend(LOGIN_THROTTLE_REDIS_URL)
+        if LOGIN_THROTTLE_REDIS_URL
+        else MemoryRateLimitBackend()
+    ),
+    ip_capacity=float(os.getenv("LOGIN_IP_BURST", "20")),
+    ip_refill_rate=float(os.getenv("LOGIN_IP_PER_MINUTE", "20")) / 60,
+    email_capacity=float(os.getenv("LOGIN_EMAIL_BURST", "5")),
+    email_refill_rate=float(os.getenv("LOGIN_EMAIL_PER_MINUTE", "5")) / 60,
+    backoff_after=int(os.getenv("LOGIN_BACKOFF_AFTER", "3")),
+    backoff_base=float(os.getenv("LOGIN_BACKOFF_BASE", "1")),
+    backoff_max=float(os.getenv("LOGIN_BACKOFF_MAX", "300")),
+)
+
+usage_event_log = UsageEventLog(
+    AsyncSessionLocal,
+    flush_interval=float(os.getenv("USAGE_EVENT_FLUSH_INTERVAL", "5")),
+    rollup_interval=float(os.getenv("USAGE_ROLLUP_INTERVAL", "60")),
+    rollup_settle=float(os.getenv("USAGE_ROLLUP_SETTLE", "300")),
+    max_buffer=int(os.getenv("USAGE_EVENT_BUFFER_SIZE", "100000")),
+)
+usage_counter = UsageCounter(
+    AsyncSessionLocal,
+    flush_interval=float(os.getenv("USAGE_FLUSH_INTERVAL", "5")),
+    event_log=usage_event_log,
+    replica_router=replica_router,
+)
+
+HEALTH_PROBE_TIMEOUT = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+
+
+async def probe_postgres():
+    async with AsyncSessionLocal() as db:
+        await db.scalar(text("SELECT 1"))
+
+
+async def probe_ragflow():
+    system_status = await rag_service.get_system_status(authorization=RAG_AUTHORIZATION)
+    if system_status is None:
+        raise RuntimeError("RAGFlow system status unavailable")
+    return system_status
+
+
+health_monitor = HealthMonitor(
+    {
+        "postgres": probe_postgres,
+        "ragflow": probe_ragflow,
+        "llm": lambda: asyncio.to_thread(llm_service.ping, HEALTH_PROBE_TIMEOUT),
+        "ocr": lambda: asyncio.to_thread(ocr_service.ping, HEALTH_PROBE_TIMEOUT),
+        "lightrag": graph_service.health,
+    },
+    interval=float(os.getenv("HEALTH_CHECK_INTERVAL", "15")),
+    timeout=HEALTH_PROBE_TIMEOUT,
+    history_size=int(os.getenv("HEALTH_HISTORY_SIZE", "40")),
+)
+
+event_loop_lag_monitor = EventLoopLagMonitor(
+    interval=float(os.getenv("EVENT_LOOP_LAG_INTERVAL", "0.5"))
+)
+loop_watchdog = LoopWatchdog(
+    threshold=float(os.getenv("LOOP_STALL_THRESHOLD", "0.1")),
+    heartbeat_interval=float(os.getenv("LOOP_WATCHDOG_INTERVAL", "0.02")),
+    recent_stalls=int(os.getenv("LOOP_STALL_HISTORY", "100")),
+)
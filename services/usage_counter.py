@@ -0,0 +1,141 @@
+import asyncio
+import enum
+import uuid
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import UUID, Integer, column, update, values
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from db.models import UserStatistics
+from db.replicas import ReplicaRouter
+from services.usage_events import UsageEventLog
+
+
+class UsageMetric(str, enum.Enum):
+    conversation = "conversation_count"
+    ocr_recognition = "ocr_recognition_count"
+    knowledge_base_search = "knowledge_base_search_count"
+    flow_chart = "flow_chart_count"
+    mind_map = "mind_map_count"
+
+
+class UsageCounter:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        flush_interval: float = 5,
+        event_log: Optional[UsageEventLog] = None,
+        replica_router: Optional[ReplicaRouter] = None,
+        batch_size: int = 1000,
+    ):
+        self._session_factory = session_factory
+        self._flush_interval = flush_interval
+        self._event_log = event_log
+        self._replica_router = replica_router
+        self._batch_size = batch_size
+        self._deltas: Dict[Tuple[uuid.UUID, UsageMetric], int] = defaultdict(int)
+        self._in_flight: Dict[uuid.UUID, Dict[UsageMetric, int]] = {}
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._flush_interval > 0 and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def aclose(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Usage counter flush failed: {e}", flush=True)
+
+    def increment(self, user_id: uuid.UUID, metric: UsageMetric, amount: int = 1):
+        self._deltas[(user_id, metric)] += amount
+        if self._event_log is not None:
+            for _ in range(amount):
+                self._event_log.record(user_id, metric.name)
+
+    def pending(self, user_id: uuid.UUID) -> Dict[UsageMetric, int]:
+        in_flight = self._in_flight.get(user_id, {})
+        return {
+            metric: self._deltas.get((user_id, metric), 0) + in_flight.get(metric, 0)
+            for metric in UsageMetric
+        }
+
+    def has_pending(self, user_id: uuid.UUID) -> bool:
+        return user_id in self._in_flight or any(
+            self._deltas.get((user_id, metric)) for metric in UsageMetric
+        )
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Usage counter flush failed: {e}", flush=True)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._deltas:
+                return
+            deltas, self._deltas = self._deltas, defaultdict(int)
+
+            rows: Dict[uuid.UUID, Dict[UsageMetric, int]] = defaultdict(dict)
+            for (user_id, metric), delta in deltas.items():
+                rows[user_id][metric] = delta
+
+            users = list(rows.items())
+            self._in_flight = dict(rows)
+            try:
+                for start in range(0, len(users), self._batch_size):
+                    batch = users[start : start + self._batch_size]
+                    try:
+                        await self._flush_batch(batch)
+                    except Exception:
+                        for user_id, counts in users[start:]:
+                            for metric, delta in counts.items():
+                                self._deltas[(user_id, metric)] += delta
+                        raise
+                    for user_id, _ in batch:
+                        self._in_flight.pop(user_id, None)
+                        if self._replica_router is not None:
+                            self._replica_router.pin(user_id)
+            finally:
+                self._in_flight = {}
+
+    async def _flush_batch(
+        self, batch: List[Tuple[uuid.UUID, Dict[UsageMetric, int]]]
+    ):
+        delta_table = values(
+            column("user_id", UUID(as_uuid=True)),
+            *[column(metric.value, Integer) for metric in UsageMetric],
+            name="deltas",
+        ).data(
+            [
+                (user_id, *[counts.get(metric, 0) for metric in UsageMetric])
+                for user_id, counts in batch
+            ]
+        )
+        statement = (
+            update(UserStatistics)
+            .where(UserStatistics.user_id == delta_table.c.user_id)
+            .values(
+                {
+                    metric.value: getattr(UserStatistics, metric.value)
+                    + delta_table.c[metric.value]
+                    for metric in UsageMetric
+                }
+            )
+            .execution_options(synchronize_session=False)
+        )
+        async with self._session_factory() as db:
+            await db.execute(statement)
+            await db.commit()
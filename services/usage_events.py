@@ -0,0 +1,212 @@
+import asyncio
+import datetime
+import time
+import uuid
+from collections import deque
+from typing import Deque, Optional, Set, Tuple
+
+from sqlalchemy import insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from db.models import UsageEvent, UsageRollupWatermark
+
+ROLLUP_LOCK_KEY = 0x75736167
+ROLLUP_WATERMARK = "usage"
+
+HOURLY_ROLLUP_SQL = text(
+    """
+    INSERT INTO usage_hourly_rollups (bucket, user_id, metric, count)
+    SELECT
+        date_trunc('hour', occurred_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+        user_id,
+        metric,
+        count(*)
+    FROM usage_events
+    WHERE occurred_at >= :start
+    GROUP BY 1, 2, 3
+    ON CONFLICT (bucket, user_id, metric) DO UPDATE SET count = EXCLUDED.count
+    """
+)
+
+DAILY_ROLLUP_SQL = text(
+    """
+    INSERT INTO usage_daily_rollups (bucket, user_id, metric, count)
+    SELECT (bucket AT TIME ZONE 'UTC')::date, user_id, metric, sum(count)
+    FROM usage_hourly_rollups
+    WHERE bucket >= :start
+    GROUP BY 1, 2, 3
+    ON CONFLICT (bucket, user_id, metric) DO UPDATE SET count = EXCLUDED.count
+    """
+)
+
+WATERMARK_SQL = text(
+    """
+    INSERT INTO usage_rollup_watermarks (name, refreshed_until)
+    VALUES (:name, :refreshed_until)
+    ON CONFLICT (name) DO UPDATE SET refreshed_until = EXCLUDED.refreshed_until
+    """
+)
+
+
+def _month_start(moment: datetime.datetime) -> datetime.datetime:
+    return moment.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(moment: datetime.datetime) -> datetime.datetime:
+    return _month_start(_month_start(moment) + datetime.timedelta(days=32))
+
+
+def _hour_start(moment: datetime.datetime) -> datetime.datetime:
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+class UsageEventLog:
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        flush_interval: float = 5,
+        rollup_interval: float = 60,
+        rollup_settle: float = 300,
+        max_buffer: int = 100000,
+    ):
+        self._session_factory = session_factory
+        self._flush_interval = flush_interval
+        self._rollup_interval = rollup_interval
+        self._rollup_settle = datetime.timedelta(seconds=rollup_settle)
+        self._max_buffer = max_buffer
+        self._events: Deque[Tuple[uuid.UUID, str, datetime.datetime]] = deque(
+            maxlen=max_buffer
+        )
+        self.dropped = 0
+        self._partitions: Set[datetime.datetime] = set()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._flush_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def aclose(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"Usage event flush failed: {e}", flush=True)
+
+    def record(self, user_id: uuid.UUID, metric: str):
+        if len(self._events) >= self._max_buffer:
+            self.dropped += 1
+        self._events.append(
+            (user_id, metric, datetime.datetime.now(datetime.timezone.utc))
+        )
+
+    async def _run(self):
+        next_rollup = time.monotonic() + self._rollup_interval
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"Usage event flush failed: {e}", flush=True)
+            if self._rollup_interval > 0 and time.monotonic() >= next_rollup:
+                next_rollup = time.monotonic() + self._rollup_interval
+                try:
+                    await self.refresh_rollups()
+                except Exception as e:
+                    print(f"Usage rollup refresh failed: {e}", flush=True)
+
+    async def _ensure_partitions(
+        self, db: AsyncSession, months: Set[datetime.datetime]
+    ):
+        for month in sorted(months - self._partitions):
+            end = _next_month(month)
+            await db.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS usage_events_{month:%Y_%m} "
+                    f"PARTITION OF usage_events "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{end.isoformat()}')"
+                )
+            )
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._events:
+                return
+            events = list(self._events)
+            self._events.clear()
+
+            months = {_month_start(occurred_at) for _, _, occurred_at in events}
+            months.add(_next_month(max(months)))
+            try:
+                async with self._session_factory() as db:
+                    await self._ensure_partitions(db, months)
+                    await db.execute(
+                        insert(UsageEvent),
+                        [
+                            {
+                                "user_id": user_id,
+                                "metric": metric,
+                                "occurred_at": occurred_at,
+                            }
+                            for user_id, metric, occurred_at in events
+                        ],
+                    )
+                    await db.commit()
+            except Exception:
+                free = self._max_buffer - len(self._events)
+                requeue = events[-free:] if free > 0 else []
+                if len(requeue) < len(events):
+                    self.dropped += len(events) - len(requeue)
+                    print(
+                        f"Usage event buffer full, dropped "
+                        f"{len(events) - len(requeue)} events "
+                        f"({self.dropped} total)",
+                        flush=True,
+                    )
+                self._events.extendleft(reversed(requeue))
+                raise
+            self._partitions |= months
+
+    async def refresh_rollups(self):
+        async with self._session_factory() as db:
+            locked = await db.scalar(
+                text("SELECT pg_try_advisory_xact_lock(:key)"),
+                {"key": ROLLUP_LOCK_KEY},
+            )
+            if not locked:
+                await db.rollback()
+                return
+
+            start = await db.scalar(
+                select(UsageRollupWatermark.refreshed_until).where(
+                    UsageRollupWatermark.name == ROLLUP_WATERMARK
+                )
+            )
+            if start is None:
+                start = await db.scalar(
+                    text("SELECT min(occurred_at) FROM usage_events")
+                )
+            if start is None:
+                await db.rollback()
+                return
+            start = _hour_start(start.astimezone(datetime.timezone.utc))
+
+            await db.execute(HOURLY_ROLLUP_SQL, {"start": start})
+            await db.execute(DAILY_ROLLUP_SQL, {"start": start.replace(hour=0)})
+            refreshed_until = _hour_start(
+                datetime.datetime.now(datetime.timezone.utc) - self._rollup_settle
+            )
+            await db.execute(
+                WATERMARK_SQL,
+                {
+                    "name": ROLLUP_WATERMARK,
+                    "refreshed_until": max(start, refreshed_until),
+                },
+            )
+            await db.commit()
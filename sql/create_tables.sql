@@ -8,7 +8,8 @@ CREATE TABLE users (
     password_hash VARCHAR(255) NOT NULL,
     created_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP,
-    type user_type NOT NULL DEFAULT 'user'
+    type user_type NOT NULL DEFAULT 'user',
+    token_version INTEGER NOT NULL DEFAULT 0
 );
 -- 创建会话表
 CREATE TABLE conversations (
@@ -28,9 +29,9 @@ CREATE TABLE user_statistics (
     flow_chart_count INTEGER NOT NULL DEFAULT 0,
     mind_map_count INTEGER NOT NULL DEFAULT 0
 );
--- 为user_id添加索引以提高查询效率
-CREATE INDEX idx_conversations_user_id ON conversations(user_id);
-CREATE INDEX idx_user_statistics_user_id ON user_statistics(user_id);
+-- 为会话列表查询与用户统计添加索引
+CREATE INDEX idx_conversations_user_id_updated_at ON conversations(user_id, updated_at DESC);
+CREATE UNIQUE INDEX uq_user_statistics_user_id ON user_statistics(user_id);
 -- 创建自动更新时间的触发器函数
 CREATE OR REPLACE FUNCTION update_updated_time() RETURNS TRIGGER AS $$ BEGIN NEW.updated_at = CURRENT_TIMESTAMP;
 RETURN NEW;
@@ -42,3 +43,31 @@ UPDATE ON users FOR EACH ROW EXECUTE FUNCTION update_updated_time();
 -- 为会话表添加触发器
 CREATE TRIGGER trigger_update_conversations_updated_time BEFORE
 UPDATE ON conversations FOR EACH ROW EXECUTE FUNCTION update_updated_time();
+-- 创建用量事件表（按月分区）
+CREATE TABLE usage_events (
+    id BIGSERIAL,
+    occurred_at TIMESTAMPTZ NOT NULL,
+    user_id UUID NOT NULL,
+    metric VARCHAR(64) NOT NULL,
+    PRIMARY KEY (id, occurred_at)
+) PARTITION BY RANGE (occurred_at);
+CREATE INDEX idx_usage_events_occurred_at ON usage_events USING brin (occurred_at);
+-- 创建用量小时/日汇总表
+CREATE TABLE usage_hourly_rollups (
+    bucket TIMESTAMPTZ NOT NULL,
+    user_id UUID NOT NULL,
+    metric VARCHAR(64) NOT NULL,
+    count BIGINT NOT NULL,
+    PRIMARY KEY (bucket, user_id, metric)
+);
+CREATE TABLE usage_daily_rollups (
+    bucket DATE NOT NULL,
+    user_id UUID NOT NULL,
+    metric VARCHAR(64) NOT NULL,
+    count BIGINT NOT NULL,
+    PRIMARY KEY (bucket, user_id, metric)
+);
+CREATE TABLE usage_rollup_watermarks (
+    name VARCHAR(64) PRIMARY KEY,
+    refreshed_until TIMESTAMPTZ NOT NULL
+);